@@ -0,0 +1,67 @@
+"""
+Gunicorn settings; gunicorn reads this file when started from backend/.
+
+Binding and the number of workers keep gunicorn's defaults, which follow the PORT and
+WEB_CONCURRENCY environment variables. With WARM_CACHES=true the catalog cache is
+warmed on start (see `manage.py warm_caches`) before any worker takes traffic:
+
+- GUNICORN_PRELOAD=true imports the application once in the master process and
+  warms it there; workers are forked with the imports done and, with the default
+  in-memory cache, the catalog pages already cached.
+- Otherwise every worker warms its own cache after loading the application, which
+  has to finish within the worker timeout; top sales serializes the whole catalog.
+"""
+import glob
+import os
+
+
+def env_flag(name, default):
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+
+preload_app = env_flag("GUNICORN_PRELOAD", "false")
+warm_caches = env_flag("WARM_CACHES", "false")
+
+
+def warm(log):
+    from django.core.management import call_command
+
+    try:
+        call_command("warm_caches", verbosity=0)
+    except Exception:
+        # A cold cache is slower, not broken; serve anyway.
+        log.exception("Warming the caches failed")
+
+
+def on_starting(server):
+    # Snapshots left by a previous server's workers would otherwise be counted forever;
+    # temporary files are left by workers killed mid-flush.
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, "metrics-*")):
+            os.remove(path)
+
+
+def when_ready(server):
+    if not (preload_app and warm_caches):
+        return
+    warm(server.log)
+
+    from django.core.cache import caches
+    from django.db import connections
+
+    from lingerie_shop.db_pool import close_pools
+    from shop import catalog_cache
+
+    # Forked workers must not share the master's sockets, nor report its warm-up as theirs.
+    # A pool also keeps its minimum connections open and runs threads that would not
+    # survive the fork; each worker opens its own on first use.
+    connections.close_all()
+    close_pools()
+    caches.close_all()
+    catalog_cache.counts.clear()
+
+
+def post_worker_init(worker):
+    if warm_caches and not preload_app:
+        warm(worker.log)
@@ -0,0 +1,53 @@
+import atexit
+
+from django.db import connections
+
+
+def get_pools():
+    """Return {alias: psycopg ConnectionPool} for the databases configured with a pool."""
+    pools = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            pools[alias] = pool
+    return pools
+
+
+def pool_stats():
+    """
+    Return pool sizes, utilization and checkout wait times per database alias.
+
+    Counters such as requests_num and requests_wait_ms are cumulative for this
+    process since the pool was opened.
+    """
+    stats = {}
+    for alias, pool in get_pools().items():
+        values = pool.get_stats()
+        in_use = values.get("pool_size", 0) - values.get("pool_available", 0)
+        requests = values.get("requests_num", 0)
+        stats[alias] = {
+            **values,
+            "in_use": in_use,
+            "utilization": in_use / pool.max_size if pool.max_size else 0,
+            "mean_wait_ms": values.get("requests_wait_ms", 0) / requests if requests else 0,
+        }
+    return stats
+
+
+def pool_metrics():
+    for alias, values in pool_stats().items():
+        yield "gauge", "db_pool_connections", (("alias", alias), ("state", "in_use")), values["in_use"]
+        yield "gauge", "db_pool_connections", (("alias", alias), ("state", "idle")), values.get("pool_available", 0)
+        yield "gauge", "db_pool_connections", (("alias", alias), ("state", "waiting")), values.get("requests_waiting", 0)
+        yield "counter", "db_pool_requests_total", (("alias", alias),), values.get("requests_num", 0)
+        yield "counter", "db_pool_wait_seconds_total", (("alias", alias),), values.get("requests_wait_ms", 0) / 1000
+
+
+def close_pools():
+    for alias in list(get_pools()):
+        connections[alias].close_pool()
+
+
+def close_pools_at_exit():
+    """Close the pools when the worker exits, so Postgres sees clean disconnects."""
+    atexit.register(close_pools)
@@ -0,0 +1,112 @@
+"""
+Send catalog and analytics reads to read replicas.
+
+ReplicaRoutingMiddleware decides per request whether reads may use a replica:
+only safe-method requests may, and not within REPLICA_PIN_SECONDS of a write by
+the same client (tracked with a cookie), so clients read their own writes despite
+replication lag. The first write during a request also pins the rest of that
+request to the primary. Outside requests (management commands, workers) every
+query goes to the primary.
+
+To try it locally with SQLite, migrate the default database, copy its file and
+point a "replica_0" alias at the copy.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+_route = ContextVar("db_route", default=None)
+
+
+class RouteState:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def current_replica():
+    state = _route.get()
+    return state.replica if state is not None else None
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = tuple(settings.DATABASE_REPLICAS)
+        self.models = frozenset(settings.REPLICA_MODELS)
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label in self.models:
+            replica = current_replica()
+            if replica is not None:
+                return replica
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        state = _route.get()
+        if state is not None:
+            state.replica = None
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication.
+        return db not in self.replicas
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _route.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _route.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _route.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        replica = None
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            # One replica per request, so all of its reads see the same point in time.
+            replica = random.choice(settings.DATABASE_REPLICAS)
+        return RouteState(replica)
+
+    def finish(self, state, response):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
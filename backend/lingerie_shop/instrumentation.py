@@ -0,0 +1,141 @@
+"""
+Per-request query count, database time and render time.
+
+RequestStatsMiddleware collects the numbers for every request, adds them to the
+response as a Server-Timing header (visible in browser dev tools) if SERVER_TIMING
+is on and logs one JSON line per request at INFO to the "lingerie_shop.requests"
+logger. The same numbers feed the /metrics histograms.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics
+
+logger = logging.getLogger("lingerie_shop.requests")
+
+_stats = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("request", "queries", "db_time", "render_time")
+
+    def __init__(self, request=None):
+        self.request = request
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+def current_stats():
+    return _stats.get()
+
+
+def count_query(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # Installed on the connection itself rather than per request, so queries run on
+    # other threads for the request (async views fan out) are counted as well.
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+    if settings.SLOW_QUERY_THRESHOLD_MS:
+        # Imported here: slow_queries reads the request from this module's stats.
+        from .slow_queries import capture_slow_query
+
+        if capture_slow_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(capture_slow_query)
+
+
+def install_on_open_connections():
+    # Connections opened before this module was imported missed connection_created.
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(None, connection)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that adds its rendering time to the request's stats."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            stats = _stats.get()
+            if stats is not None:
+                stats.render_time += time.perf_counter() - start
+
+
+class RequestStatsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def start(self, request):
+        install_on_open_connections()
+        stats = RequestStats(request)
+        return stats, _stats.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        app = max(total - stats.db_time - stats.render_time, 0)
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = ", ".join((
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+                f"render;dur={stats.render_time * 1000:.1f}",
+                f"app;dur={app * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ))
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 2),
+            "render_ms": round(stats.render_time * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }))
+        metrics.observe_request(request, response, stats, total)
+        return response
@@ -0,0 +1,237 @@
+"""
+Request metrics in the Prometheus text format, served at /metrics.
+
+RequestStatsMiddleware records every request into this process's counters and
+histograms, labeled by URL route and view action. Counters that other modules
+keep for themselves (throttle decisions, cache hits, connection pools) are read
+through the METRICS_COLLECTORS callables when a snapshot is taken.
+
+With several worker processes set METRICS_DIR: each process then writes its
+snapshot to its own file there at most every METRICS_FLUSH_INTERVAL seconds and
+at exit, and /metrics sums the files of all processes. Files of exited processes
+keep contributing to counters and histograms, so totals never go backwards, but
+not to gauges. gunicorn.conf.py empties the directory when the server starts.
+"""
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled, by route, action, method and status.", None),
+    "http_request_duration_seconds": (
+        "histogram", "Time from the first middleware to the response.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "http_response_size_bytes": (
+        "histogram", "Response body size; streamed responses are not counted.",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    ),
+    "db_queries_per_request": (
+        "histogram", "Database queries run while handling a request.",
+        (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    ),
+    "db_time_per_request_seconds": (
+        "histogram", "Time spent in database queries while handling a request.",
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    "throttle_decisions_total": ("counter", "Throttle checks, by scope and decision.", None),
+    "jwt_user_cache_requests_total": ("counter", "JWT user lookups, by cache result.", None),
+    "google_certs_cache_requests_total": ("counter", "Google certificate lookups, by cache result.", None),
+    "catalog_cache_requests_total": ("counter", "Cacheable catalog reads, by cache result.", None),
+    "db_pool_connections": ("gauge", "Pooled connections, by database alias and state.", None),
+    "db_pool_requests_total": ("counter", "Connection checkouts from the pool.", None),
+    "db_pool_wait_seconds_total": ("counter", "Time spent waiting for a pooled connection.", None),
+}
+
+
+class Registry:
+    """Counters and histograms of this process, keyed by (name, labels)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # [per-bucket counts..., +Inf count], sum
+        self.histograms = {}
+        self.last_flush = 0.0
+        # Separate from lock: snapshot() takes that one while a flush holds this.
+        self.flush_lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        with self.lock:
+            entry = self.histograms.get((name, labels))
+            if entry is None:
+                entry = self.histograms[(name, labels)] = [[0] * (len(buckets) + 1), 0.0]
+            counts = entry[0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            entry[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [
+                [name, list(labels), list(counts), total] for (name, labels), (counts, total) in self.histograms.items()
+            ]
+        gauges = []
+        for path in settings.METRICS_COLLECTORS:
+            for kind, name, labels, value in import_string(path)():
+                (gauges if kind == "gauge" else counters).append([name, list(labels), value])
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+
+registry = Registry()
+
+
+def route_labels(request):
+    """Return the URL pattern and the view action (or view name) that handled the request."""
+    match = request.resolver_match
+    if match is None:
+        # Unmatched paths share one label so scanners cannot blow up the series count.
+        return "unmatched", "unmatched"
+    actions = getattr(match.func, "actions", None)
+    if actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+    else:
+        view_class = getattr(match.func, "cls", None) or getattr(match.func, "view_class", None)
+        action = view_class.__name__ if view_class else match.func.__name__
+    # Router patterns are regular expressions; drop their anchors.
+    route = (match.route or match.view_name).replace("^", "").replace("$", "")
+    return route, action
+
+
+def observe_request(request, response, stats, duration):
+    route, action = route_labels(request)
+    labels = (("route", route), ("action", action), ("method", request.method))
+    registry.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+    registry.observe("http_request_duration_seconds", labels, duration)
+    if not response.streaming:
+        registry.observe("http_response_size_bytes", labels, len(response.content))
+    registry.observe("db_queries_per_request", labels, stats.queries)
+    registry.observe("db_time_per_request_seconds", labels, stats.db_time)
+    if settings.METRICS_DIR and time.monotonic() - registry.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def snapshot_path(pid):
+    return os.path.join(settings.METRICS_DIR, f"metrics-{pid}.json")
+
+
+def flush():
+    """Write this process's snapshot to METRICS_DIR, replacing its previous one atomically."""
+    with registry.flush_lock:
+        registry.last_flush = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        pid = os.getpid()
+        # Its own temporary file, so a flush can never replace another one's half-written file.
+        fd, temporary = tempfile.mkstemp(prefix=f"metrics-{pid}.", suffix=".tmp", dir=settings.METRICS_DIR)
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(registry.snapshot(), file)
+            os.replace(temporary, snapshot_path(pid))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+def flush_at_exit():
+    if settings.METRICS_DIR:
+        atexit.register(flush)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def load_snapshots():
+    if not settings.METRICS_DIR:
+        return [registry.snapshot()]
+    flush()
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "metrics-*.json")):
+        try:
+            with open(path) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            # Removed or half-written by a process that was killed mid-write.
+            continue
+    return snapshots
+
+
+def merge(snapshots):
+    counters, gauges, histograms = defaultdict(float), defaultdict(float), {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        if pid_alive(snapshot["pid"]):
+            for name, labels, value in snapshot["gauges"]:
+                gauges[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, counts, total in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+    return counters, gauges, histograms
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+
+def format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render():
+    """Return all processes' metrics in the Prometheus text exposition format."""
+    counters, gauges, histograms = merge(load_snapshots())
+    series = defaultdict(list)
+    for (name, labels), value in counters.items():
+        series[name].append(f"{name}{format_labels(labels)} {format_number(value)}")
+    for (name, labels), value in gauges.items():
+        series[name].append(f"{name}{format_labels(labels)} {format_number(value)}")
+    for name in series:
+        series[name].sort()
+    for (name, labels), (counts, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(METRICS[name][2] + ("+Inf",), counts):
+            cumulative += count
+            series[name].append(f"{name}_bucket{format_labels(labels, (('le', bound),))} {cumulative}")
+        series[name].append(f"{name}_sum{format_labels(labels)} {format_number(total)}")
+        series[name].append(f"{name}_count{format_labels(labels)} {cumulative}")
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        if name in series:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *series[name]]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,90 @@
+"""
+The OpenAPI schema, generated once instead of on every request.
+
+`manage.py generate_schema` (run by build.sh) writes the schema as JSON and YAML to
+OPENAPI_SCHEMA_DIR. The swagger and redoc pages load it from there; if the files
+are missing, the schema is generated on the first request and kept in memory.
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from drf_yasg import openapi
+from rest_framework.request import Request
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+FORMATS = {
+    ".json": ("openapi.json", "application/json"),
+    ".yaml": ("openapi.yaml", "application/yaml"),
+}
+
+_lock = threading.Lock()
+
+
+def generate_schema():
+    """Introspect every public endpoint and return {format: encoded schema bytes}."""
+    # The generator and its inspectors are only needed here, not to serve the files.
+    from django.test import RequestFactory
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    # Views are introspected as an anonymous visitor would see them, as the live schema view did.
+    django_request = RequestFactory().get("/swagger.json/")
+    django_request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    request = Request(django_request)
+    request.user = AnonymousUser()
+    # A placeholder url keeps the request's host out; without host and schemes in
+    # the document, clients use the host that served it.
+    schema = OpenAPISchemaGenerator(info=API_INFO, url="http://localhost").get_schema(request=request, public=True)
+    del schema["host"], schema["schemes"]
+    return {
+        ".json": OpenAPICodecJson(validators=[], pretty=True).encode(schema),
+        ".yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def write_schema(directory=None):
+    """Generate the schema into directory (OPENAPI_SCHEMA_DIR by default) and return the written paths."""
+    directory = directory or settings.OPENAPI_SCHEMA_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for format, content in generate_schema().items():
+        path = os.path.join(directory, FORMATS[format][0])
+        with open(path, "wb") as file:
+            file.write(content)
+        paths.append(path)
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(format):
+    """Return (content, ETag) of the schema in format, reading the generated file once."""
+    path = os.path.join(settings.OPENAPI_SCHEMA_DIR, FORMATS[format][0])
+    try:
+        with open(path, "rb") as file:
+            content = file.read()
+    except FileNotFoundError:
+        with _lock:
+            logger.warning("%s is missing, generating the OpenAPI schema; run `manage.py generate_schema`", path)
+            content = generated_schema()[format]
+    return content, hashlib.sha256(content).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def generated_schema():
+    return generate_schema()
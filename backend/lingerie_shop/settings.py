@@ -9,10 +9,12 @@ https://docs.djangoproject.com/en/4.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
+import copy
 import os
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -56,6 +58,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "lingerie_shop.instrumentation.RequestStatsMiddleware",
+    "lingerie_shop.db_routers.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -71,7 +75,7 @@ ROOT_URLCONF = "lingerie_shop.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
+        "DIRS": [BASE_DIR / "lingerie_shop" / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -90,6 +94,11 @@ WSGI_APPLICATION = "lingerie_shop.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Connections come from a per-process psycopg pool (DB_POOL=false falls back to persistent
+# connections kept for DB_CONN_MAX_AGE seconds). With CONN_HEALTH_CHECKS the pool checks
+# each connection before handing it out.
+DB_POOL = os.environ.get("DB_POOL", "true").lower() in ("1", "true", "yes")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -97,7 +106,56 @@ DATABASES = {
         "NAME": os.environ["POSTGRES_DB"],
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+                "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+                "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+                "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+            },
+        } if DB_POOL else {},
+    }
+}
+
+# Read replicas share the primary's credentials; POSTGRES_REPLICA_HOSTS is a comma-separated
+# host list. Safe-method reads of REPLICA_MODELS go to a replica (see lingerie_shop.db_routers),
+# except for REPLICA_PIN_SECONDS after the same client wrote something.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))):
+    DATABASES[f"replica_{index}"] = {
+        **copy.deepcopy(DATABASES["default"]),
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["lingerie_shop.db_routers.PrimaryReplicaRouter"]
+REPLICA_MODELS = (
+    "shop.Product",
+    "shop.ProductImage",
+    "shop.Collection",
+    "shop.Category",
+    "shop.Brand",
+    "shop.Color",
+    "shop.Size",
+    "shop.Comment",
+    "shop.DailySalesRollup",
+)
+REPLICA_PIN_COOKIE = "db_primary"
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
+# With REDIS_URL (e.g. redis://localhost:6379/0) the default cache is shared by all workers;
+# otherwise every process keeps its own in memory.
+REDIS_URL = os.environ.get("REDIS_URL", "")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL,
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
 }
 
 
@@ -147,27 +205,161 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "uploads")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "lingerie_shop.throttling.AnonRateThrottle",
+        "lingerie_shop.throttling.UserRateThrottle",
+        "lingerie_shop.throttling.ScopedRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "10000/day", "user": "10000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10000/day",
+        "user": "10000/day",
+        "cart": "120/min",
+        "order": "30/min",
+        "auth": "20/min",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "lingerie_shop.instrumentation.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    # Proxies in front of the app (Render's load balancer). Throttles identify clients by the
+    # X-Forwarded-For entry this many hops back, which a client cannot forge.
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 1)),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60 * 60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.UserTokenObtainPairSerializer",
+}
+
+# Where throttle counters live: "lingerie_shop.throttling.CacheStore" uses the THROTTLE_CACHE
+# cache alias, which should be shared (set REDIS_URL); outside DEBUG the servers fall back to
+# SQLiteStore with a warning otherwise. "lingerie_shop.throttling.SQLiteStore" keeps them in a
+# local file shared by the workers on one machine.
+THROTTLE_STORE = os.environ.get("THROTTLE_STORE", "lingerie_shop.throttling.CacheStore")
+THROTTLE_CACHE = "default"
+THROTTLE_SQLITE_PATH = os.environ.get("THROTTLE_SQLITE_PATH", os.path.join(BASE_DIR, "throttle.sqlite3"))
+
+# Add query count, DB time and render time to responses as a Server-Timing header. Off by
+# default outside DEBUG: it tells every client how much database work each endpoint does.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "true" if DEBUG else "false").lower() in ("1", "true", "yes")
+
+# Prometheus metrics at /metrics (see lingerie_shop.metrics). Scrapers authenticate with
+# "Authorization: Bearer <METRICS_TOKEN>"; without a token the endpoint only answers when DEBUG is on.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# With several worker processes, a directory (e.g. on tmpfs) where each process writes
+# its snapshot, at most every METRICS_FLUSH_INTERVAL seconds. Empty keeps metrics per process.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = 5
+# Callables yielding ("counter" | "gauge", name, labels, value) for counters kept elsewhere.
+METRICS_COLLECTORS = [
+    "lingerie_shop.throttling.throttle_metrics",
+    "lingerie_shop.db_pool.pool_metrics",
+    "user.authentication.user_cache_metrics",
+    "user.google_certs.cert_cache_metrics",
+    "shop.catalog_cache.catalog_cache_metrics",
+]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per request with its query count and timings, at INFO; outside DEBUG
+        # only set REQUEST_LOG_LEVEL=INFO where the log volume is affordable.
+        "lingerie_shop.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "INFO" if DEBUG else "WARNING"),
+            "propagate": False,
+        },
+        "lingerie_shop.slow_queries": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
 }
 
+# Queries slower than this many milliseconds are kept for /admin/slow-queries/ and logged
+# to "lingerie_shop.slow_queries" (see lingerie_shop.slow_queries). Unset or 0 disables it.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 0))
+# Share of captured SELECTs whose plan is fetched; on PostgreSQL that runs the query again.
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get("SLOW_QUERY_EXPLAIN_RATE", 0.1))
+SLOW_QUERY_BUFFER_SIZE = 200
+
+# Product list pages, top sales and the category, collection, color and size lists are
+# cached in the CATALOG_CACHE alias for this long (see shop.catalog_cache); 0 disables it.
+CATALOG_CACHE = "default"
+CATALOG_CACHE_TTL = timedelta(seconds=int(os.environ.get("CATALOG_CACHE_TTL", 60)))
+# `manage.py warm_caches` renders pages as requested at this URL, since cached responses
+# contain absolute links. Use the scheme and host Django sees, i.e. behind a TLS-terminating
+# proxy without SECURE_PROXY_SSL_HEADER the http:// one.
+CATALOG_WARM_URL = os.environ.get("CATALOG_WARM_URL", "http://lingerie-shop.onrender.com")
+# Product list pages warm_caches fills.
+CATALOG_WARM_PAGES = int(os.environ.get("CATALOG_WARM_PAGES", 5))
+
+# Users resolved from JWTs are cached per process for this long (see user.authentication).
+JWT_USER_CACHE_TTL = timedelta(seconds=int(os.environ.get("JWT_USER_CACHE_TTL", 60)))
+JWT_USER_CACHE_SIZE = 4096
+
 AUTH_USER_MODEL = "user.User"
 
+# How long a stored Idempotency-Key response is replayed for retried requests.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# How long checkout holds stock for an order that is not paid yet (set-payment) before
+# `manage.py release_stock_reservations` returns it and cancels the order.
+STOCK_RESERVATION_TTL = timedelta(minutes=30)
+
+# Number of counter rows per product that checkout spreads sales_counter increments over.
+SALES_COUNTER_SHARDS = int(os.environ.get("SALES_COUNTER_SHARDS", 8))
+
+# Post-order side effects, dispatched by `manage.py run_outbox_worker`.
+OUTBOX_HANDLERS = {
+    "order.created": ["shop.outbox.log_event", "shop.outbox.send_order_confirmation"],
+}
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_LEASE = timedelta(minutes=5)
+
+# Order confirmations are sent over SMTP when EMAIL_HOST is set and written to the worker's
+# output otherwise.
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "")
+EMAIL_BACKEND = (
+    "django.core.mail.backends.smtp.EmailBackend" if EMAIL_HOST else "django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 587))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+
+# Orders younger than this are left for the next `manage.py rollup_sales` run.
+SALES_ROLLUP_LAG = timedelta(hours=1)
+
+# Orders older than this are moved to the archive tables by `manage.py archive_orders`.
+ORDER_ARCHIVE_AFTER = timedelta(days=int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", 365)))
+
+# Where GoogleView gets Google's signing certificates from. "user.google_certs.StaticCertSource"
+# serves GOOGLE_STATIC_CERTS ({key id: PEM certificate}) instead, for tests and offline development.
+GOOGLE_CERTS_SOURCE = os.environ.get("GOOGLE_CERTS_SOURCE", "user.google_certs.HTTPCertSource")
+GOOGLE_STATIC_CERTS = {}
+# Cached certificates are refetched in the background this long before they expire.
+GOOGLE_CERTS_REFRESH_AHEAD = timedelta(minutes=5)
+
+# Where `manage.py generate_schema` writes the OpenAPI schema that /swagger.json/, /swagger.yaml/,
+# /swagger/ and /redoc/ serve (see lingerie_shop.schema).
+OPENAPI_SCHEMA_DIR = os.environ.get("OPENAPI_SCHEMA_DIR", os.path.join(BASE_DIR, "schema"))
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+
 
 CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
@@ -177,3 +369,5 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
     "http://116.203.195.165:8080"
 ]
+
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
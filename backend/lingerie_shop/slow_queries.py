@@ -0,0 +1,142 @@
+"""
+Capture queries slower than SLOW_QUERY_THRESHOLD_MS together with where they came from.
+
+Off unless the threshold is set. A captured query records its SQL, duration, the
+route and action of the request that ran it and the innermost project frame that
+issued it. Parameters are kept for SELECTs only: writes carry passwords, tokens and
+customers' addresses. For a sample of captured SELECTs (SLOW_QUERY_EXPLAIN_RATE) the plan is
+fetched right away on the same connection: EXPLAIN (ANALYZE, BUFFERS) on
+PostgreSQL, which runs the query a second time, or EXPLAIN QUERY PLAN on SQLite.
+
+Entries go to a per-process ring buffer of SLOW_QUERY_BUFFER_SIZE, browsable at
+/admin/slow-queries/ for superusers, and to the "lingerie_shop.slow_queries" logger.
+"""
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import instrumentation
+from .metrics import route_labels
+
+logger = logging.getLogger("lingerie_shop.slow_queries")
+
+_explaining = ContextVar("explaining_slow_query", default=False)
+_ids = itertools.count(1)
+
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+# The execute wrappers themselves are on every query's stack.
+WRAPPER_FILES = {str(Path(__file__).resolve()), str(Path(instrumentation.__file__).resolve())}
+
+
+class SlowQueryLog:
+    """The most recent slow queries of this process, newest first."""
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.appendleft(entry)
+
+    def all(self):
+        with self.lock:
+            return list(self.entries)
+
+    def get(self, entry_id):
+        with self.lock:
+            return next((entry for entry in self.entries if entry["id"] == entry_id), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_BUFFER_SIZE)
+
+
+def caller_location():
+    """Return "path:line in function" of the innermost project frame that is not an execute wrapper."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename.startswith(PROJECT_DIR) and filename not in WRAPPER_FILES and "site-packages" not in filename:
+            return f"{Path(filename).relative_to(PROJECT_DIR)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def explain(connection, sql, params):
+    """Return the plan of a SELECT as text, run in a savepoint so a failure cannot break the caller's transaction."""
+    if connection.vendor == "postgresql":
+        statement = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+    elif connection.vendor == "sqlite":
+        statement = f"EXPLAIN QUERY PLAN {sql}"
+    else:
+        statement = f"EXPLAIN {sql}"
+    token = _explaining.set(True)
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(statement, params)
+                rows = cursor.fetchall()
+    finally:
+        _explaining.reset(token)
+    if connection.vendor == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def capture_slow_query(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold and duration_ms >= threshold:
+            record(context["connection"], sql, params, many, duration_ms)
+
+
+def record(connection, sql, params, many, duration_ms):
+    stats = instrumentation.current_stats()
+    request = stats.request if stats is not None else None
+    route, action = route_labels(request) if request is not None else (None, None)
+    is_select = not many and sql.lstrip()[:6].upper() == "SELECT"
+    entry = {
+        "id": next(_ids),
+        "at": timezone.now(),
+        "duration_ms": round(duration_ms, 2),
+        "database": connection.alias,
+        "sql": sql,
+        "params": repr(params)[:2000] if is_select else None,
+        "method": request.method if request is not None else None,
+        "path": request.path if request is not None else None,
+        "route": route,
+        "action": action,
+        "location": caller_location(),
+        "plan": None,
+        "plan_error": None,
+    }
+    # EXPLAIN ANALYZE executes the statement, so only plain SELECTs are explained.
+    if is_select and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+        try:
+            entry["plan"] = explain(connection, sql, params)
+        except DatabaseError as error:
+            entry["plan_error"] = str(error)
+    slow_query_log.add(entry)
+    logger.warning(json.dumps({
+        key: value for key, value in entry.items() if key not in ("id", "at", "params", "plan")
+    }))
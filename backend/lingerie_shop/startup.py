@@ -0,0 +1,121 @@
+"""
+Measure how long a worker takes to boot and which imports that time goes to.
+
+A boot is what a fresh gunicorn worker does before serving its first request:
+set Django up, load the WSGI application and the URLconf. Every measurement runs
+in a new interpreter with `-X importtime`, so modules already imported by the
+calling process do not hide their cost.
+
+Modules in LAZY_MODULES are only needed by a few endpoints or commands and are
+imported where they are used; a boot that imports one of them is a regression.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# module: what needs it
+LAZY_MODULES = {
+    "google.auth.jwt": "Google login",
+    "drf_yasg.generators": "schema generation",
+    "drf_yasg.inspectors": "schema generation",
+    "PIL.Image": "image upload validation",
+}
+
+BOOT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_boot(**environ):
+    """
+    Boot once in a new interpreter and return ({"seconds", "modules"}, import time lines).
+
+    environ overrides environment variables of the boot.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE, **environ)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"Boot failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr.splitlines()
+
+
+def parse_importtime(lines):
+    """Return {module: (self ms, cumulative ms, nesting depth)} from `-X importtime` output."""
+    modules = {}
+    for line in lines:
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules[name] = (int(own) / 1000, int(cumulative) / 1000, len(indent) // 2)
+    return modules
+
+
+def by_package(modules):
+    """Sum each top-level package's own import time, in ms."""
+    totals = defaultdict(float)
+    for name, (own, _, _) in modules.items():
+        totals[name.partition(".")[0]] += own
+    return dict(totals)
+
+
+def profile_startup(repeat=5):
+    """
+    Boot repeat times and return the profile.
+
+    Boot times are summarized over all runs; per-module times come from the fastest
+    run, which has the least scheduling noise.
+    """
+    runs = [run_boot() for _ in range(repeat)]
+    seconds = [boot["seconds"] for boot, _ in runs]
+    fastest, lines = min(runs, key=lambda run: run[0]["seconds"])
+    modules = parse_importtime(lines)
+    return {
+        "boot_ms": {
+            "min": min(seconds) * 1000,
+            "median": statistics.median(seconds) * 1000,
+            "max": max(seconds) * 1000,
+        },
+        "import_ms": sum(own for own, _, _ in modules.values()),
+        "module_count": len(fastest["modules"]),
+        "modules": modules,
+        "packages": by_package(modules),
+        "eager": sorted(name for name in LAZY_MODULES if name in fastest["modules"]),
+    }
+
+
+def compare(profile, baseline, threshold):
+    """
+    Compare a profile with a baseline one.
+
+    Returns (rows, regressions): rows are (metric, baseline, current, change %) and
+    regressions the rows where the median boot or the import time grew by more
+    than threshold percent.
+    """
+    rows, regressions = [], []
+    for metric, old, new in (
+        ("boot median ms", baseline["boot_ms"]["median"], profile["boot_ms"]["median"]),
+        ("import ms", baseline["import_ms"], profile["import_ms"]),
+        ("modules", baseline["module_count"], profile["module_count"]),
+    ):
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append((metric, old, new, change))
+        if metric != "modules" and change > threshold:
+            regressions.append(rows[-1])
+    return rows, regressions
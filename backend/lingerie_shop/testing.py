@@ -0,0 +1,41 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Transaction control statements issued by TestCase and atomic() are not queries.
+IGNORED_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN", "COMMIT")
+
+
+def captured_queries(context):
+    return [query["sql"] for query in context.captured_queries if not query["sql"].startswith(IGNORED_PREFIXES)]
+
+
+class QueryBudgetMixin:
+    """TestCase assertions that keep the number of queries an endpoint runs within a budget."""
+
+    def request_queries(self, method, path, client=None, **kwargs):
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method.lower())(path, **kwargs)
+        return response, captured_queries(context)
+
+    def assertQueryBudget(self, budget, method, path, client=None, **kwargs):
+        """Request path and fail if it runs more than budget queries. Returns the response."""
+        response, queries = self.request_queries(method, path, client, **kwargs)
+        self.assertLess(response.status_code, 400, f"{method} {path} returned {response.status_code}")
+        if len(queries) > budget:
+            self.fail(
+                f"{method} {path} ran {len(queries)} queries, budget is {budget}:\n"
+                + "\n".join(f"  {sql}" for sql in queries)
+            )
+        return response
+
+    def assertConstantQueries(self, method, path, grow, client=None, **kwargs):
+        """Fail if path runs more queries after grow() adds rows, e.g. more products on the page."""
+        _, before = self.request_queries(method, path, client, **kwargs)
+        grow()
+        _, after = self.request_queries(method, path, client, **kwargs)
+        if len(after) != len(before):
+            self.fail(
+                f"{method} {path} went from {len(before)} to {len(after)} queries as rows were added:\n"
+                + "\n".join(f"  {sql}" for sql in after)
+            )
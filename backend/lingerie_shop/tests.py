@@ -0,0 +1,286 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from shop.models import Order, Product
+
+from . import throttling
+from .db_pool import pool_metrics, pool_stats
+from .db_routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from .metrics import Registry, flush
+from .schema import load_schema
+from .slow_queries import record, slow_query_log
+from .startup import LAZY_MODULES, run_boot
+from .throttling import AnonRateThrottle, CacheStore, SQLiteStore, check_shared_store, get_store
+
+
+class ClockedThrottle(AnonRateThrottle):
+    rate = "4/min"
+    now = 0
+
+    def timer(self):
+        return self.now
+
+
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """Weigh the previous window's requests by how much of it the sliding window still covers."""
+
+    def setUp(self):
+        caches["default"].clear()
+        self.request = Request(APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.1"))
+
+    def allowed(self, store, now, count):
+        ClockedThrottle.now = now
+        with mock.patch("lingerie_shop.throttling.get_store", return_value=store):
+            return [ClockedThrottle().allow_request(self.request, None) for _ in range(count)]
+
+    def check_windows(self, store):
+        # A fresh window allows the rate; rejected requests count too.
+        self.assertEqual(self.allowed(store, 60, 5), [True] * 4 + [False])
+        # Halfway through the next window half of the previous 5 still count.
+        self.assertEqual(self.allowed(store, 150, 2), [True, False])
+        throttle = ClockedThrottle()
+        with mock.patch("lingerie_shop.throttling.get_store", return_value=store):
+            throttle.allow_request(self.request, None)
+        self.assertGreater(throttle.wait(), 0)
+        # After a quiet window the full rate is back.
+        self.assertEqual(self.allowed(store, 240, 5), [True] * 4 + [False])
+
+    def test_cache_store(self):
+        self.check_windows(CacheStore())
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(THROTTLE_SQLITE_PATH=os.path.join(directory, "throttle.sqlite3")):
+                self.check_windows(SQLiteStore())
+
+    def test_servers_fall_back_from_a_per_process_cache(self):
+        self.addCleanup(get_store.cache_clear)
+        self.addCleanup(setattr, throttling, "_serving", False)
+        with self.assertLogs("lingerie_shop.throttling", "WARNING"):
+            check_shared_store()
+        self.assertIsInstance(get_store(), SQLiteStore)
+        get_store.cache_clear()
+        with self.settings(DEBUG=True):
+            self.assertIsInstance(get_store(), CacheStore)
+
+    def test_clients_cannot_rotate_their_key(self):
+        keys = {
+            ClockedThrottle().get_cache_key(Request(APIRequestFactory().get(
+                "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=f"{forged}, 203.0.113.7"
+            )), None)
+            for forged in ("198.51.100.1", "198.51.100.2")
+        }
+        self.assertEqual(len(keys), 1)
+        self.assertIn("203.0.113.7", keys.pop())
+
+
+class FakePool:
+    max_size = 10
+
+    def get_stats(self):
+        return {"pool_size": 6, "pool_available": 2, "requests_num": 4, "requests_wait_ms": 10, "requests_waiting": 1}
+
+
+@mock.patch("lingerie_shop.db_pool.get_pools", return_value={"default": FakePool()})
+class DatabasePoolTests(TestCase):
+    """Report pool utilization and waits per database alias."""
+
+    def test_stats_and_metrics(self, get_pools):
+        stats = pool_stats()["default"]
+        self.assertEqual((stats["in_use"], stats["utilization"], stats["mean_wait_ms"]), (4, 0.4, 2.5))
+        metrics = {(name, labels): value for _, name, labels, value in pool_metrics()}
+        self.assertEqual(metrics["db_pool_connections", (("alias", "default"), ("state", "waiting"))], 1)
+        self.assertEqual(metrics["db_pool_wait_seconds_total", (("alias", "default"),)], 0.01)
+
+    def test_endpoint_is_for_admins(self, get_pools):
+        client = APIClient()
+        self.assertEqual(client.get("/api/v1/health/db-pool/").status_code, 401)
+        client.force_authenticate(get_user_model()(is_staff=True))
+        self.assertEqual(client.get("/api/v1/health/db-pool/").json()["default"]["in_use"], 4)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Send safe reads of catalog models to a replica unless the client just wrote."""
+
+    def route(self, request, write=False):
+        router = PrimaryReplicaRouter()
+        routed = {}
+
+        def view(request):
+            if write:
+                router.db_for_write(Order)
+            routed["product"] = router.db_for_read(Product)
+            routed["order"] = router.db_for_read(Order)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return routed, response
+
+    def test_safe_reads_use_a_replica(self):
+        routed, response = self.route(RequestFactory().get("/"))
+        self.assertEqual(routed, {"product": "replica_0", "order": "default"})
+        self.assertNotIn("db_primary", response.cookies)
+
+    def test_write_pins_the_request_and_the_client(self):
+        routed, response = self.route(RequestFactory().get("/"), write=True)
+        self.assertEqual(routed["product"], "default")
+        self.assertEqual(response.cookies["db_primary"]["max-age"], 5)
+
+        request = RequestFactory().get("/")
+        request.COOKIES["db_primary"] = "1"
+        routed, _ = self.route(request)
+        self.assertEqual(routed["product"], "default")
+
+    def test_unsafe_requests_and_other_code_use_the_primary(self):
+        routed, _ = self.route(RequestFactory().post("/"))
+        self.assertEqual(routed["product"], "default")
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Product), "default")
+
+
+@override_settings(CATALOG_CACHE_TTL=timedelta(0))
+class RequestStatsTests(TestCase):
+    """Report each request's queries and timings in a header and the request log."""
+
+    def test_server_timing_header_is_opt_in(self):
+        with self.settings(SERVER_TIMING=False):
+            self.assertNotIn("Server-Timing", self.client.get("/api/v1/categories/"))
+        with self.settings(SERVER_TIMING=True):
+            timing = self.client.get("/api/v1/categories/")["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, app;dur=[\d.]+, total;dur=')
+
+    def test_request_is_logged(self):
+        with self.assertLogs("lingerie_shop.requests", "INFO") as logs:
+            self.client.get("/api/v1/categories/")
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry["view"], entry["status"]), ("shop:category-list", 200))
+        self.assertGreaterEqual(entry["queries"], 1)
+
+
+@override_settings(METRICS_TOKEN="scrape-token", METRICS_DIR="")
+class MetricsTests(TestCase):
+    """Serve request histograms and collected counters to Prometheus."""
+
+    def setUp(self):
+        patcher = mock.patch("lingerie_shop.metrics.registry", Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, token="scrape-token"):
+        return self.client.get("/metrics", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_scrapers_need_the_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.scrape("wrong").status_code, 403)
+        self.assertEqual(self.scrape().status_code, 200)
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.scrape().status_code, 403)
+
+    def test_renders_requests_and_collectors(self):
+        self.client.get("/api/v1/categories/")
+        response = self.scrape()
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        lines = response.content.decode().splitlines()
+        labels = 'route="api/v1/categories/",action="list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', lines)
+        self.assertIn(f"db_queries_per_request_count{{{labels}}} 1", lines)
+        self.assertIn("# TYPE throttle_decisions_total counter", lines)
+
+    def test_concurrent_flushes_keep_one_snapshot(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, self.settings(METRICS_DIR=metrics_dir):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda _: flush(), range(200)))
+            self.assertEqual(os.listdir(metrics_dir), [f"metrics-{os.getpid()}.json"])
+
+
+class SlowQueryTests(TestCase):
+    """Keep captured slow queries free of written data and away from staff who are not superusers."""
+
+    def setUp(self):
+        slow_query_log.clear()
+        self.addCleanup(slow_query_log.clear)
+
+    def test_params_kept_for_selects_only(self):
+        with self.assertLogs("lingerie_shop.slow_queries", "WARNING"):
+            record(connection, "SELECT 1 WHERE %s = %s", ("a@example.com", 1), False, 5.0)
+            record(connection, "UPDATE user_user SET password = %s", ("secret",), False, 5.0)
+        update, select = slow_query_log.all()
+        self.assertIsNone(update["params"])
+        self.assertIn("a@example.com", select["params"])
+
+    def test_page_requires_superuser(self):
+        names = {"first_name": "Admin", "last_name": "Test"}
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="x", phone="+380000000003", is_staff=True, **names
+        )
+        superuser = get_user_model().objects.create_superuser(
+            email="root@example.com", password="x", phone="+380000000004", **names
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get("/admin/slow-queries/").status_code, 403)
+        self.client.force_login(superuser)
+        self.assertEqual(self.client.get("/admin/slow-queries/").status_code, 200)
+
+
+class SchemaFileTests(TestCase):
+    """Serve the generated OpenAPI files with an ETag, generating them if they are missing."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = self.settings(OPENAPI_SCHEMA_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        load_schema.cache_clear()
+        self.addCleanup(load_schema.cache_clear)
+
+    def test_serves_the_file_and_revalidates(self):
+        with open(os.path.join(self.directory, "openapi.json"), "wb") as file:
+            file.write(b'{"swagger": "2.0"}')
+        response = self.client.get("/swagger.json/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, b'{"swagger": "2.0"}')
+
+        revalidated = self.client.get("/swagger.json/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get("/swagger.xml/").status_code, 404)
+
+    def test_generates_missing_files(self):
+        with self.assertLogs("lingerie_shop.schema", "WARNING"):
+            response = self.client.get("/swagger.json/")
+        self.assertEqual(response.status_code, 200)
+        schema = json.loads(response.content)
+        self.assertEqual(schema["basePath"], "/api/v1")
+        self.assertIn("/products/", schema["paths"])
+
+    def test_swagger_page_loads_the_file(self):
+        response = self.client.get("/swagger/")
+        self.assertEqual(response.status_code, 200)
+        page = response.content.decode()
+        start = page.index(">", page.index('id="swagger-settings"')) + 1
+        ui_settings = json.loads(page[start:page.index("</script>", start)])
+        self.assertEqual(ui_settings["url"], reverse("schema-json", kwargs={"format": ".json"}))
+
+
+class StartupImportTests(SimpleTestCase):
+    """Keep modules that only a few endpoints need out of worker boot."""
+
+    def test_boot_does_not_import_lazy_modules(self):
+        boot, _ = run_boot()
+        self.assertEqual([name for name in LAZY_MODULES if name in boot["modules"]], [])
@@ -0,0 +1,188 @@
+"""
+Sliding-window-counter throttles backed by a store shared between worker processes.
+
+DRF's throttles keep a list of request timestamps per client in the default
+cache, which is per process with locmem and grows with the rate. Here each client
+holds two integers per scope: the request count of the current fixed window and of
+the previous one. The previous count is weighted by how much of it still overlaps
+the sliding window, which approximates a true sliding log within a few percent.
+"""
+import functools
+import logging
+import random
+import sqlite3
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+_decisions = Counter()
+_decisions_lock = threading.Lock()
+
+
+def record_decision(scope, allowed):
+    with _decisions_lock:
+        _decisions[(scope, "allowed" if allowed else "throttled")] += 1
+
+
+def throttle_stats():
+    """Return {(scope, "allowed" | "throttled"): count} for this process."""
+    with _decisions_lock:
+        return dict(_decisions)
+
+
+def throttle_metrics():
+    for (scope, decision), count in throttle_stats().items():
+        yield "counter", "throttle_decisions_total", (("scope", scope), ("decision", decision)), count
+
+
+class CacheStore:
+    """Counters in a Django cache; use a shared backend (Redis, Memcached) in production."""
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE]
+
+    def hit(self, key, slot, duration):
+        current_key, previous_key = f"throttle:{key}:{slot}", f"throttle:{key}:{slot - 1}"
+        self.cache.add(current_key, 0, timeout=2 * duration)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr().
+            self.cache.set(current_key, 1, timeout=2 * duration)
+            current = 1
+        return current, self.cache.get(previous_key, 0)
+
+
+class SQLiteStore:
+    """Counters in a local SQLite file, shared by all workers on one machine."""
+    cleanup_probability = 0.01
+
+    def __init__(self):
+        self.path = settings.THROTTLE_SQLITE_PATH
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS throttle_counter ("
+                "key TEXT NOT NULL, slot INTEGER NOT NULL, count INTEGER NOT NULL, expires REAL NOT NULL, "
+                "PRIMARY KEY (key, slot)) WITHOUT ROWID"
+            )
+            self.local.connection = connection
+        return connection
+
+    def hit(self, key, slot, duration):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO throttle_counter (key, slot, count, expires) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (key, slot) DO UPDATE SET count = count + 1",
+                (key, slot, (slot + 2) * duration),
+            )
+            counts = dict(connection.execute(
+                "SELECT slot, count FROM throttle_counter WHERE key = ? AND slot IN (?, ?)",
+                (key, slot, slot - 1),
+            ))
+            if random.random() < self.cleanup_probability:
+                connection.execute("DELETE FROM throttle_counter WHERE expires < ?", (slot * duration,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return counts[slot], counts.get(slot - 1, 0)
+
+
+# Set by check_shared_store() when a server boots; tests and commands keep the configured store.
+_serving = False
+
+
+@functools.lru_cache(maxsize=None)
+def get_store():
+    store = import_string(settings.THROTTLE_STORE)()
+    if (
+        _serving and not settings.DEBUG
+        and isinstance(store, CacheStore) and isinstance(store.cache, (LocMemCache, DummyCache))
+    ):
+        # Every worker would allow the full rate.
+        logger.warning(
+            "THROTTLE_CACHE %r is not shared between processes; keeping throttle counters in %s instead. "
+            "Set REDIS_URL to share them between machines.",
+            settings.THROTTLE_CACHE, settings.THROTTLE_SQLITE_PATH,
+        )
+        return SQLiteStore()
+    return store
+
+
+def check_shared_store():
+    """Outside DEBUG, fall back to SQLiteStore at boot if the configured counters are per process."""
+    global _serving
+    _serving = True
+    get_store.cache_clear()
+    get_store()
+
+
+class SlidingWindowMixin:
+    """
+    Replace SimpleRateThrottle's timestamp history with sliding window counters.
+
+    Rejected requests are counted as well, so a client hammering the API stays
+    throttled until it slows down.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        slot, offset = divmod(self.timer(), self.duration)
+        current, previous = get_store().hit(self.key, int(slot), self.duration)
+        self.overlap = 1 - offset / self.duration
+        self.counts = current, previous
+        allowed = previous * self.overlap + current <= self.num_requests
+        record_decision(self.scope, allowed)
+        if not allowed:
+            logger.info("Throttled %s (scope %s)", self.key, self.scope)
+        return allowed
+
+    def wait(self):
+        current, previous = self.counts
+        if current >= self.num_requests or not previous:
+            # Only the end of the current window frees capacity.
+            return self.duration * self.overlap
+        # Time until the previous window's weighted share falls below the spare capacity.
+        return max(self.duration * (self.overlap - (self.num_requests - current) / previous), 0)
+
+
+class AnonRateThrottle(SlidingWindowMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SlidingWindowMixin, throttling.UserRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(SlidingWindowMixin, throttling.ScopedRateThrottle):
+    """Limit views by their `throttle_scope`, e.g. "cart", "order" or "auth"."""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
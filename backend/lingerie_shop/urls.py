@@ -16,33 +16,24 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
 
 from django.conf import settings
 from django.conf.urls.static import static
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Snippets API",
-      default_version='v1',
-      description="Test description",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
+from .views import DatabasePoolView, SchemaUIView, metrics_view, schema_file, slow_query_list
 
 urlpatterns = [
-    path("swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"),
-    path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("swagger<format>/", schema_file, name="schema-json"),
+    path("swagger/", SchemaUIView.as_view(renderer_classes=(SwaggerUIRenderer,)), name="schema-swagger-ui"),
+    path("redoc/", SchemaUIView.as_view(renderer_classes=(ReDocRenderer,)), name="schema-redoc"),
+    path("admin/slow-queries/", admin.site.admin_view(slow_query_list), name="slow-queries"),
     path("admin/", admin.site.urls),
     path("api/v1/auth/", include("user.urls", namespace="user")),
     path("api/v1/", include("shop.urls", namespace="shop")),
+    path("api/v1/async/", include("shop.async_urls", namespace="shop-async")),
+    path("api/v1/health/db-pool/", DatabasePoolView.as_view(), name="db-pool"),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG:
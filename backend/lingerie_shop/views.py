@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import etag, require_GET
+from drf_yasg import openapi
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics
+from .db_pool import pool_stats
+from .schema import API_INFO, FORMATS, load_schema
+from .slow_queries import slow_query_log
+
+
+class DatabasePoolView(APIView):
+    """Report connection pool utilization and wait times for this worker process."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+def schema_etag(request, format):
+    return load_schema(format)[1] if format in FORMATS else None
+
+
+@require_GET
+@etag(schema_etag)
+def schema_file(request, format):
+    """Serve the pre-generated OpenAPI schema; clients revalidate it with its ETag."""
+    if format not in FORMATS:
+        raise Http404
+    content, _ = load_schema(format)
+    response = HttpResponse(content, content_type=FORMATS[format][1])
+    patch_cache_control(response, public=True, max_age=300)
+    return response
+
+
+class SchemaUIView(APIView):
+    """
+    Swagger UI or ReDoc page (pass renderer_classes to as_view()).
+
+    The page loads the schema from SPEC_URL, so only an empty document with the API's
+    title and version is rendered here.
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    # Not part of the API itself.
+    swagger_schema = None
+
+    def get(self, request):
+        return Response(openapi.Swagger(info=API_INFO, _prefix="/"))
+
+
+@require_GET
+def metrics_view(request):
+    """Serve the metrics of all worker processes in the Prometheus text format."""
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if not constant_time_compare(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def slow_query_list(request):
+    """Admin page listing this worker's captured slow queries, optionally for one route."""
+    # Captured SQL and parameters can include any customer's data.
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if request.method == "POST":
+        slow_query_log.clear()
+        return redirect(request.path)
+    entries = slow_query_log.all()
+    route = request.GET.get("route")
+    if route:
+        entries = [entry for entry in entries if entry["route"] == route]
+    return TemplateResponse(request, "admin/slow_queries.html", {
+        **admin.site.each_context(request),
+        "title": "Slow queries",
+        "entries": entries,
+        "route": route,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "explain_rate": settings.SLOW_QUERY_EXPLAIN_RATE,
+        "buffer_size": settings.SLOW_QUERY_BUFFER_SIZE,
+    })
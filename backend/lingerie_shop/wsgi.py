@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lingerie_shop.settings")
 
 application = get_wsgi_application()
+
+# Imported after the app is set up; the pool itself opens lazily on the first query.
+from lingerie_shop.db_pool import close_pools_at_exit  # noqa: E402
+from lingerie_shop.metrics import flush_at_exit  # noqa: E402
+from lingerie_shop.throttling import check_shared_store  # noqa: E402
+
+close_pools_at_exit()
+flush_at_exit()
+check_shared_store()
@@ -12,7 +12,12 @@ from .models import (
     Order,
     CartItem,
     OrderItem,
-    Comment
+    Comment,
+    StockItem,
+    StockReservation,
+    OutboxEvent,
+    ArchivedOrder,
+    ArchivedOrderItem
 )
 
 admin.site.register(Color)
@@ -26,6 +31,7 @@ admin.site.register(Order)
 admin.site.register(CartItem)
 admin.site.register(OrderItem)
 admin.site.register(Comment)
+admin.site.register(StockReservation)
 
 
 class ProductImageInline(admin.TabularInline):
@@ -35,9 +41,34 @@ class ProductImageInline(admin.TabularInline):
     readonly_fields = ("id",)
 
 
+class StockItemInline(admin.TabularInline):
+    model = StockItem
+    extra = 1
+    fields = ("size", "color", "quantity")
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    inlines = [ProductImageInline]
+    inlines = [ProductImageInline, StockItemInline]
     list_display = ("title", "price", "is_sales", "rating")
     search_fields = ("title", "code")
     list_filter = ("is_sales", "rating")
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "topic", "status", "attempts", "available_at", "created_at")
+    list_filter = ("status", "topic")
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    inlines = [ArchivedOrderItemInline]
+    list_display = ("id", "user", "total_price", "status", "created_at", "archived_at")
+    list_filter = ("status",)
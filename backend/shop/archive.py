@@ -0,0 +1,58 @@
+from django.db import transaction
+
+from .models import Address, ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+def archive_orders(order_ids, cutoff):
+    """
+    Move the given orders created before cutoff, with their items and addresses, to the archive.
+
+    Orders locked by a concurrent transaction are skipped and picked up by a later run.
+    Return the number of orders archived.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.filter(id__in=order_ids, created_at__lt=cutoff)
+            .select_related("delivery_address")
+            .select_for_update(skip_locked=True, of=("self",))
+        )
+        if not orders:
+            return 0
+        ArchivedOrder.objects.bulk_create(
+            ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                session_key=order.session_key,
+                first_name=order.first_name,
+                last_name=order.last_name,
+                email=order.email,
+                phone=order.phone,
+                total_price=order.total_price,
+                status=order.status,
+                created_at=order.created_at,
+                delivery_method=order.delivery_method,
+                delivery_cost=order.delivery_cost,
+                payment_method=order.payment_method,
+                postal_code=order.delivery_address.postal_code,
+                country=order.delivery_address.country,
+                city=order.delivery_address.city,
+                street_address=order.delivery_address.street_address,
+                address_comment=order.delivery_address.comment,
+            )
+            for order in orders
+        )
+        ArchivedOrderItem.objects.bulk_create(
+            ArchivedOrderItem(
+                id=item.id,
+                order_id=item.order_id,
+                product_id=item.product_id,
+                size_id=item.size_id,
+                color_id=item.color_id,
+                quantity=item.quantity,
+                price=item.price,
+            )
+            for item in OrderItem.objects.filter(order__in=orders)
+        )
+        # Deleting the address cascades to the order, its items and its stock reservations.
+        Address.objects.filter(id__in=[order.delivery_address_id for order in orders]).delete()
+        return len(orders)
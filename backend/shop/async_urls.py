@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path("products/", async_views.product_list, name="product-list"),
+    path("products/search/", async_views.product_search, name="product-search"),
+    path("products/<int:pk>/", async_views.product_detail, name="product-detail"),
+    path("collections/", async_views.collection_list, name="collection-list"),
+    path("categories/", async_views.category_list, name="category-list"),
+    path("cart/", async_views.cart_detail, name="cart-detail"),
+]
+
+app_name = "shop-async"
@@ -0,0 +1,215 @@
+"""
+Async versions of the hot catalog and cart read endpoints, for the ASGI entry point.
+
+They return the same payloads as their DRF counterparts in views.py. Simple lookups use
+Django's async ORM. The async ORM runs every query on one shared thread, so independent
+queries of a single request (page, count, facets) go through `fan_out` instead, which
+runs each on its own worker thread and connection.
+
+DRF's view machinery is synchronous, so authentication (claims-only, no database) and
+throttling are applied by the `api_view` decorator.
+"""
+import asyncio
+import functools
+import math
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, connections
+from django.db.models import Count, aprefetch_related_objects
+from django.http import Http404, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from user.authentication import ClaimsJWTAuthentication
+
+from .counters import with_total_sales
+from .filters import ProductFilter
+from .models import Brand, Cart, Category, Collection, Product
+from .serializers import (
+    CartSerializer,
+    CategorySerializer,
+    CollectionSerializer,
+    ProductListSerializer,
+    ProductSerializer,
+)
+from .views import CartViewSet
+
+
+def run_in_thread(func, *args):
+    """Run a blocking ORM call on its own worker thread and hand its connection back afterwards."""
+    def call():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+async def fan_out(*calls):
+    """Run (func, *args) tuples concurrently and return their results in order."""
+    return await asyncio.gather(*(run_in_thread(*call) for call in calls))
+
+
+def check_throttles(request, scope):
+    """Return the longest wait of the default throttles that reject the request, or None."""
+    view = SimpleNamespace(throttle_scope=scope)
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            waits.append(throttle.wait())
+    return max(waits) if waits else None
+
+
+def api_view(scope=None):
+    """Authenticate from JWT claims, apply the default throttles and render the result as JSON."""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                result = ClaimsJWTAuthentication().authenticate(request)
+            except AuthenticationFailed as error:
+                return JsonResponse({"detail": str(error.detail)}, status=401)
+            request.user = result[0] if result else AnonymousUser()
+
+            wait = await sync_to_async(check_throttles)(request, scope)
+            if wait is not None:
+                response = JsonResponse({"detail": "Request was throttled."}, status=429)
+                response["Retry-After"] = str(math.ceil(wait))
+                return response
+
+            try:
+                data = await view(request, *args, **kwargs)
+            except Http404 as error:
+                return JsonResponse({"detail": str(error) or "Not found."}, status=404)
+            if isinstance(data, JsonResponse):
+                return data
+            return JsonResponse(data, safe=False)
+
+        return wrapper
+
+    return decorator
+
+
+def page_links(request, page, count, page_size):
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, "page", page + 1) if page * page_size < count else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, "page")
+    else:
+        previous_url = replace_query_param(url, "page", page - 1)
+    return next_url, previous_url
+
+
+def page_number(request):
+    try:
+        page = int(request.GET.get("page", 1))
+        if page < 1:
+            raise ValueError
+    except ValueError:
+        raise Http404("Invalid page.")
+    return page
+
+
+async def paginated(request, queryset, serializer_class):
+    """Serialize one page of a short list in DRF's page number envelope."""
+    page, page_size = page_number(request), api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    rows = [row async for row in queryset[(page - 1) * page_size:page * page_size]]
+    if page > 1 and not rows:
+        raise Http404("Invalid page.")
+    next_url, previous_url = page_links(request, page, count, page_size)
+    results = serializer_class(rows, many=True, context={"request": request}).data
+    return {"count": count, "next": next_url, "previous": previous_url, "results": results}
+
+
+def filter_products(request):
+    filterset = ProductFilter(request.GET, queryset=Product.objects.all(), request=request)
+    if not filterset.is_valid():
+        return None, filterset.errors
+    return filterset.qs, None
+
+
+def serialize_page(queryset, request, offset, limit):
+    products = queryset.prefetch_related("images")[offset:offset + limit]
+    return ProductListSerializer(products, many=True, context={"request": request}).data
+
+
+def facet_counts(model, queryset):
+    rows = model.objects.filter(product__in=queryset.values("id")).annotate(count=Count("product")).order_by("name")
+    return [{"id": row.id, "name": row.name, "count": row.count} for row in rows]
+
+
+async def paginated_products(request, facets=False):
+    queryset, errors = await sync_to_async(filter_products)(request)
+    if errors:
+        return JsonResponse(errors, status=400)
+    page = page_number(request)
+    page_size = api_settings.PAGE_SIZE
+
+    calls = [(queryset.count,), (serialize_page, queryset, request, (page - 1) * page_size, page_size)]
+    if facets:
+        calls += [(facet_counts, Brand, queryset), (facet_counts, Category, queryset)]
+    count, results, *facet_results = await fan_out(*calls)
+    if page > 1 and not results:
+        raise Http404("Invalid page.")
+
+    next_url, previous_url = page_links(request, page, count, page_size)
+    data = {"count": count, "next": next_url, "previous": previous_url, "results": results}
+    if facets:
+        data["facets"] = dict(zip(("brand", "category"), facet_results))
+    return data
+
+
+@api_view()
+async def product_list(request):
+    return await paginated_products(request)
+
+
+@api_view()
+async def product_search(request):
+    """Like product_list, plus brand and category counts over the filtered products."""
+    return await paginated_products(request, facets=True)
+
+
+@api_view()
+async def product_detail(request, pk):
+    try:
+        product = await with_total_sales(Product.objects.prefetch_related(
+            "brand", "color", "size", "collection", "category", "images",
+            ProductSerializer.latest_comments_prefetch,
+        )).aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404("No Product matches the given query.")
+    return await sync_to_async(lambda: ProductSerializer(product, context={"request": request}).data)()
+
+
+@api_view()
+async def collection_list(request):
+    return await paginated(request, Collection.objects.all(), CollectionSerializer)
+
+
+@api_view()
+async def category_list(request):
+    return await paginated(request, Category.objects.all(), CategorySerializer)
+
+
+@api_view(scope="cart")
+async def cart_detail(request):
+    if request.user.is_authenticated:
+        cart, _ = await Cart.objects.aget_or_create(user_id=request.user.pk)
+    else:
+        if not request.session.session_key:
+            await request.session.acreate()
+        cart, _ = await Cart.objects.aget_or_create(session_key=request.session.session_key)
+    await aprefetch_related_objects([cart], CartViewSet.items_prefetch)
+    return CartSerializer(cart, context={"request": request}).data
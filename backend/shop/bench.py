@@ -0,0 +1,288 @@
+import collections
+import itertools
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import requests
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from .models import Brand, Category, Product
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies):
+    """Summarize a list of latencies in seconds as milliseconds."""
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+@contextmanager
+def timer(latencies):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        latencies.append(time.perf_counter() - start)
+
+
+def http_load(urls, concurrency, total, timeout=30):
+    """
+    Send `total` GET requests spread round-robin over urls from `concurrency` threads.
+
+    Each thread keeps its own keep-alive session. Returns (latencies, errors, elapsed seconds).
+    """
+    targets = itertools.cycle(urls)
+    lock = threading.Lock()
+    remaining = [total]
+    latencies, errors = [], []
+
+    def next_url():
+        with lock:
+            if remaining[0] == 0:
+                return None
+            remaining[0] -= 1
+            return next(targets)
+
+    def worker(_):
+        with requests.Session() as session:
+            while (url := next_url()) is not None:
+                try:
+                    with timer(latencies):
+                        response = session.get(url, timeout=timeout)
+                    if response.status_code >= 400:
+                        errors.append(f"{url}: HTTP {response.status_code}")
+                except requests.RequestException as error:
+                    errors.append(f"{url}: {error}")
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return latencies, errors, time.perf_counter() - began
+
+
+SERVER_TIMING_QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+CHECKOUT_PAYLOAD = {
+    "delivery_method": "courier",
+    "payment_method": "cash",
+    "delivery_address": {
+        "postal_code": "00000",
+        "country": "Benchmark",
+        "city": "Benchmark",
+        "street_address": "1 Benchmark street",
+    },
+}
+
+
+class Step(NamedTuple):
+    method: str
+    path: str
+    data: dict = None
+    timed: bool = True
+
+
+class Catalog(NamedTuple):
+    """Ids the endpoint scenarios pick from, sorted so a seed picks the same rows every run."""
+    products: list
+    categories: list
+    brands: list
+
+    @classmethod
+    def load(cls):
+        return cls(
+            list(Product.objects.filter(available=True).order_by("id").values_list("id", flat=True)),
+            list(Category.objects.order_by("id").values_list("id", flat=True)),
+            list(Brand.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+
+def product_list(rng, catalog):
+    # The first 20 pages, or fewer on a small catalog.
+    pages = min(20, max(1, -(-len(catalog.products) // api_settings.PAGE_SIZE)))
+    return [Step("GET", f"/api/v1/products/?page={rng.randint(1, pages)}")]
+
+
+def product_search(rng, catalog):
+    low = rng.randint(10, 80)
+    return [Step(
+        "GET",
+        f"/api/v1/products/search/?category={rng.choice(catalog.categories)}&brand={rng.choice(catalog.brands)}"
+        f"&price_min={low}&price_max={low + 60}&ordering=-rating",
+    )]
+
+
+def product_detail(rng, catalog):
+    return [Step("GET", f"/api/v1/products/{rng.choice(catalog.products)}/")]
+
+
+def cart_add(rng, catalog):
+    return [Step("POST", "/api/v1/cart/add/", {"product_id": rng.choice(catalog.products), "quantity": 1})]
+
+
+def checkout(rng, catalog):
+    """Fill a fresh anonymous cart with 1-5 products, then time only the order creation."""
+    lines = [
+        Step("POST", "/api/v1/cart/add/", {"product_id": product_id, "quantity": rng.randint(1, 3)}, timed=False)
+        for product_id in rng.sample(catalog.products, rng.randint(1, 5))
+    ]
+    return lines + [Step("POST", "/api/v1/order/create/", CHECKOUT_PAYLOAD)]
+
+
+# name: (steps for one iteration, whether each iteration needs a new session)
+SCENARIOS = {
+    "product_list": (product_list, False),
+    "product_search": (product_search, False),
+    "product_detail": (product_detail, False),
+    "cart_add": (cart_add, False),
+    "checkout": (checkout, True),
+}
+
+
+def client_address(index):
+    """A distinct address per simulated client, so per-client throttles behave as in production."""
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def plan(name, iterations, seed, catalog):
+    """Return the deterministic list of (client index, steps) one scenario run sends."""
+    rng = random.Random(f"{seed}:{name}")
+    steps, fresh_session = SCENARIOS[name]
+    return [(index if fresh_session else rng.randrange(64), steps(rng, catalog)) for index in range(iterations)]
+
+
+def report(latencies, queries, errors, elapsed):
+    return {
+        **summarize(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "queries": statistics.median(queries) if queries else None,
+        "errors": len(errors),
+    }
+
+
+def run_in_process(name, iterations, seed, catalog):
+    """
+    Run a scenario through the Django test client, in this process and against this database.
+
+    Throughput is requests per second of time spent in timed requests, so it has no
+    network or concurrency overhead and mainly reflects Python and query cost.
+    """
+    clients = {}
+    latencies, queries, errors = [], [], []
+    for index, steps in plan(name, iterations, seed, catalog):
+        client = clients.get(index)
+        if client is None:
+            client = clients[index] = APIClient(SERVER_NAME="localhost", REMOTE_ADDR=client_address(index))
+        for step in steps:
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.generic(
+                    step.method, step.path, json.dumps(step.data) if step.data else "", "application/json"
+                )
+                took = time.perf_counter() - start
+            if response.status_code >= 400:
+                errors.append(f"{step.method} {step.path}: HTTP {response.status_code}")
+            elif step.timed:
+                latencies.append(took)
+                queries.append(len(captured))
+    return report(latencies, queries, errors, sum(latencies)), errors
+
+
+def run_over_http(name, iterations, seed, catalog, base_url, concurrency, timeout=30):
+    """
+    Run a scenario against a running server from `concurrency` threads.
+
+    Query counts are read from the Server-Timing header, so the server must run with
+    SERVER_TIMING on. Writes are committed: point it at a disposable, seeded database.
+    """
+    pending = collections.deque(plan(name, iterations, seed, catalog))
+    lock = threading.Lock()
+    sessions = {}
+    latencies, queries, errors = [], [], []
+
+    def session_for(index):
+        with lock:
+            session = sessions.get(index)
+            if session is None:
+                session = sessions[index] = requests.Session()
+                session.headers["X-Forwarded-For"] = client_address(index)
+            return session
+
+    def worker(_):
+        while True:
+            with lock:
+                if not pending:
+                    return
+                index, steps = pending.popleft()
+            session = session_for(index)
+            for step in steps:
+                try:
+                    start = time.perf_counter()
+                    response = session.request(step.method, base_url + step.path, json=step.data, timeout=timeout)
+                    took = time.perf_counter() - start
+                except requests.RequestException as error:
+                    errors.append(f"{step.method} {step.path}: {error}")
+                    break
+                if response.status_code >= 400:
+                    errors.append(f"{step.method} {step.path}: HTTP {response.status_code}")
+                elif step.timed:
+                    latencies.append(took)
+                    match = SERVER_TIMING_QUERIES_RE.search(response.headers.get("Server-Timing", ""))
+                    if match:
+                        queries.append(int(match.group(1)))
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return report(latencies, queries, errors, time.perf_counter() - began), errors
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare endpoint results with a baseline run.
+
+    Returns (rows, regressions): rows are (endpoint, metric, baseline, current, change %)
+    and regressions the rows where p95 or p99 rose, or throughput fell, by more than
+    threshold percent, or the median query count grew at all.
+    """
+    rows, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "queries"):
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            if (
+                (metric in ("p95_ms", "p99_ms") and change > threshold)
+                or (metric == "throughput_rps" and -change > threshold)
+                or (metric == "queries" and new > old)
+            ):
+                regressions.append(row)
+    return rows, regressions
@@ -0,0 +1,106 @@
+"""
+Cache the catalog pages every visitor sees: product list pages, top sales and the
+category, collection, color and size lists.
+
+A cached entry is the response data of an anonymous-safe GET, keyed by its absolute
+URL (the responses contain absolute image and pagination links) and by the catalog
+version. Saving or deleting a catalog row replaces the version, so all entries go
+stale at once and expire after CATALOG_CACHE_TTL. Sales rankings are not tracked:
+top sales may trail checkouts by up to the TTL.
+
+The version lives in the CATALOG_CACHE alias too. With the default per-process cache,
+a change made through one worker reaches the others' entries only when they expire;
+use a shared backend to invalidate every worker at once.
+"""
+import functools
+import hashlib
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .models import Category, Collection, Color, Product, ProductImage, Size
+
+CATALOG_MODELS = (Product, ProductImage, Category, Collection, Color, Size)
+VERSION_KEY = "catalog:version"
+
+# "hit" and "miss" counts, for metrics.
+counts = Counter()
+counts_lock = threading.Lock()
+
+
+def count(result):
+    with counts_lock:
+        counts[result] += 1
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE]
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A random first version cannot collide with entries left from before an eviction.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def replace_version():
+    get_cache().set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_catalog():
+    """Make every cached catalog response stale, now and again once the transaction commits."""
+    replace_version()
+    # A request running between the write and the commit could cache the old rows
+    # under the new version.
+    transaction.on_commit(replace_version)
+
+
+def response_key(request):
+    url = request.build_absolute_uri()
+    return f"catalog:{catalog_version()}:{hashlib.sha256(url.encode()).hexdigest()}"
+
+
+def cached_response(view_method):
+    """Serve a catalog GET from the cache, storing successful responses for CATALOG_CACHE_TTL."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        ttl = settings.CATALOG_CACHE_TTL.total_seconds()
+        if not ttl or request.method != "GET":
+            return view_method(self, request, *args, **kwargs)
+        cache = get_cache()
+        key = response_key(request)
+        data = cache.get(key)
+        if data is not None:
+            count("hit")
+            return Response(data)
+        count("miss")
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, ttl)
+        return response
+
+    return wrapper
+
+
+class CachedListMixin:
+    """Serve the list action from the catalog cache."""
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+def catalog_cache_metrics():
+    with counts_lock:
+        values = dict(counts)
+    for result, value in values.items():
+        yield "counter", "catalog_cache_requests_total", (("result", result),), value
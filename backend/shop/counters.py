@@ -0,0 +1,72 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Product, SalesCounterShard
+
+
+def increment_sales(sold):
+    """
+    Add quantities from a {product_id: quantity} mapping to a random shard of each product.
+
+    Checkout never writes the Product row itself, so concurrent sales of a bestseller
+    spread over SALES_COUNTER_SHARDS rows. Rows are upserted in (product, slot) order in a
+    single statement to keep lock order deterministic.
+    """
+    if not sold:
+        return
+    rows = sorted(
+        (product_id, random.randrange(settings.SALES_COUNTER_SHARDS), quantity)
+        for product_id, quantity in sold.items()
+    )
+    qn = connection.ops.quote_name
+    table = qn(SalesCounterShard._meta.db_table)
+    count = qn("count")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('product_id')}, {qn('slot')}, {count}) "
+            f"VALUES {', '.join(['(%s, %s, %s)'] * len(rows))} "
+            f"ON CONFLICT ({qn('product_id')}, {qn('slot')}) "
+            f"DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}",
+            [value for row in rows for value in row],
+        )
+
+
+def with_total_sales(queryset):
+    """Annotate total_sales: the folded sales_counter plus any shard counts not folded yet."""
+    return queryset.annotate(
+        total_sales=F("sales_counter") + Coalesce(Sum("sales_shards__count"), 0)
+    )
+
+
+def fold_sales_counters(batch_size=500):
+    """Move shard counts into Product.sales_counter, a batch of products per transaction."""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            product_ids = list(
+                SalesCounterShard.objects.order_by("product_id")
+                .values_list("product_id", flat=True).distinct()[:batch_size]
+            )
+            if not product_ids:
+                return folded
+            shards = list(
+                SalesCounterShard.objects.filter(product_id__in=product_ids)
+                .order_by("product_id", "slot").select_for_update()
+                .values_list("id", "product_id", "count")
+            )
+            totals = defaultdict(int)
+            for _, product_id, count in shards:
+                totals[product_id] += count
+            Product.objects.filter(id__in=totals).update(
+                sales_counter=F("sales_counter") + Case(
+                    *(When(id=product_id, then=Value(count)) for product_id, count in totals.items()),
+                    output_field=IntegerField(),
+                )
+            )
+            SalesCounterShard.objects.filter(id__in=[shard_id for shard_id, _, _ in shards]).delete()
+            folded += len(totals)
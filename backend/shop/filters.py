@@ -1,12 +1,24 @@
 import django_filters
+from django.db.models import F
+
 from .models import (
     Product,
     Brand,
     Collection,
-    Category
+    Category,
+    DailySalesRollup
 )
 
 
+class NullsLastOrderingFilter(django_filters.OrderingFilter):
+    """Order with NULLs last in both directions, so unrated products never lead a rating sort."""
+
+    def get_ordering_value(self, param):
+        value = super().get_ordering_value(param)
+        field = F(value.lstrip("-"))
+        return field.desc(nulls_last=True) if value.startswith("-") else field.asc(nulls_last=True)
+
+
 class ProductFilter(django_filters.FilterSet):
     price_min = django_filters.NumberFilter(
         field_name="price",
@@ -30,6 +42,17 @@ class ProductFilter(django_filters.FilterSet):
     )
     available = django_filters.BooleanFilter(field_name="is_available")
     is_sales = django_filters.BooleanFilter(field_name="is_sales")
+    rating_min = django_filters.NumberFilter(
+        field_name="rating",
+        lookup_expr="gte"
+    )
+    reviews_min = django_filters.NumberFilter(
+        field_name="reviews",
+        lookup_expr="gte"
+    )
+    ordering = NullsLastOrderingFilter(
+        fields=("rating", "reviews", "price", "id"),
+    )
 
     class Meta:
         model = Product
@@ -39,5 +62,27 @@ class ProductFilter(django_filters.FilterSet):
                   "collection",
                   "category",
                   "available",
-                  "is_sales"
+                  "is_sales",
+                  "rating_min",
+                  "reviews_min",
                   ]
+
+
+class SalesRollupFilter(django_filters.FilterSet):
+    dimension = django_filters.ChoiceFilter(
+        choices=DailySalesRollup.DIMENSIONS,
+        required=True,
+    )
+    date_from = django_filters.DateFilter(
+        field_name="date",
+        lookup_expr="gte"
+    )
+    date_to = django_filters.DateFilter(
+        field_name="date",
+        lookup_expr="lte"
+    )
+    key = django_filters.CharFilter(field_name="key")
+
+    class Meta:
+        model = DailySalesRollup
+        fields = ["dimension", "date_from", "date_to", "key"]
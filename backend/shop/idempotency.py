@@ -0,0 +1,93 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def request_owner(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    if not request.session.session_key:
+        request.session.create()
+    return f"session:{request.session.session_key}"
+
+
+def request_fingerprint(request):
+    body = dict(request.data.lists()) if hasattr(request.data, "lists") else request.data
+    payload = json.dumps([request.method, request.path, body], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(scope):
+    """
+    Make a view action replay its stored response when retried with the same Idempotency-Key.
+
+    The key row is inserted in the same transaction as the action, so a concurrent retry
+    blocks on the unique constraint until the first attempt commits or rolls back.
+    Exceptions and 5xx responses roll the key back, so those requests can be retried.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({"detail": "Idempotency-Key is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+            owner = request_owner(request)
+            fingerprint = request_fingerprint(request)
+            lookup = {"key": key, "scope": scope, "owner": owner}
+
+            record = IdempotencyKey.objects.filter(**lookup, expires_at__gt=timezone.now()).first()
+            if record is None:
+                IdempotencyKey.objects.filter(**lookup).delete()
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            **lookup,
+                            fingerprint=fingerprint,
+                            expires_at=timezone.now() + settings.IDEMPOTENCY_KEY_TTL,
+                        )
+                        response = view_method(self, request, *args, **kwargs)
+                        if response.status_code >= 500:
+                            transaction.set_rollback(True)
+                            return response
+                        record.status_code = response.status_code
+                        record.response_body = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+                        record.save(update_fields=["status_code", "response_body"])
+                        return response
+                except IntegrityError:
+                    record = IdempotencyKey.objects.filter(**lookup).first()
+                    if record is None:
+                        return Response(
+                            {"detail": "A request with this Idempotency-Key is already in progress."},
+                            status=status.HTTP_409_CONFLICT,
+                        )
+
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {"detail": "Idempotency-Key was already used with a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            return replay(record)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .maintenance import iter_pk_batches
+from .models import Order, StockItem, StockReservation
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id, size_id=None, color_id=None):
+        self.product_id = product_id
+        self.size_id = size_id
+        self.color_id = color_id
+        super().__init__(f"Product {product_id} is out of stock for the selected size and color.")
+
+
+def reserve_stock(order, lines):
+    """
+    Take stock for every cart line of order and record StockReservations.
+
+    Must run inside the checkout transaction. Each variant is decremented with a
+    conditional UPDATE (quantity >= wanted), so concurrent checkouts queue on the row
+    lock instead of overselling, and rows are always locked in id order so two carts
+    sharing variants cannot deadlock. Products without any StockItem are not tracked.
+    """
+    wanted = defaultdict(int)
+    for line in lines:
+        wanted[(line.product_id, line.size_id, line.color_id)] += line.quantity
+
+    variants = {
+        (product_id, size_id, color_id): stock_id
+        for stock_id, product_id, size_id, color_id in StockItem.objects.filter(
+            product_id__in={product_id for product_id, _, _ in wanted}
+        ).values_list("id", "product_id", "size_id", "color_id")
+    }
+    tracked = {product_id for product_id, _, _ in variants}
+
+    to_take = []
+    for key, quantity in wanted.items():
+        if key[0] not in tracked:
+            continue
+        if key not in variants:
+            raise OutOfStock(*key)
+        to_take.append((variants[key], key, quantity))
+
+    expires_at = timezone.now() + settings.STOCK_RESERVATION_TTL
+    reservations = []
+    for stock_id, key, quantity in sorted(to_take):
+        taken = StockItem.objects.filter(pk=stock_id, quantity__gte=quantity).update(
+            quantity=F("quantity") - quantity
+        )
+        if not taken:
+            raise OutOfStock(*key)
+        reservations.append(StockReservation(
+            stock_item_id=stock_id,
+            order=order,
+            quantity=quantity,
+            expires_at=expires_at,
+        ))
+    return StockReservation.objects.bulk_create(reservations)
+
+
+def commit_reservations(order):
+    """
+    Keep the stock reserved for order for good; called when the order is paid.
+
+    Returns False if the reservations already expired and their stock was released.
+    Must run inside a transaction: the reservation rows stay locked against the
+    release job until it commits.
+    """
+    statuses = set(
+        StockReservation.objects.select_for_update().filter(order=order).values_list("status", flat=True)
+    )
+    if "released" in statuses:
+        return False
+    StockReservation.objects.filter(order=order, status="reserved").update(status="committed")
+    return True
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Return stock held by expired, uncommitted reservations and cancel their pending orders.
+
+    Paying for an order commits its reservations, so only orders left unpaid for
+    STOCK_RESERVATION_TTL are cancelled here.
+    """
+    expired = StockReservation.objects.filter(
+        status="reserved",
+        expires_at__lt=timezone.now(),
+        order__status="pending",
+    )
+    released = 0
+    for pks in iter_pk_batches(expired, batch_size):
+        with transaction.atomic():
+            batch = list(
+                expired.filter(pk__in=pks).select_for_update(of=("self",))
+                .values_list("id", "stock_item_id", "order_id", "quantity")
+            )
+            returned = defaultdict(int)
+            for _, stock_id, _, quantity in batch:
+                returned[stock_id] += quantity
+            for stock_id in sorted(returned):
+                StockItem.objects.filter(pk=stock_id).update(quantity=F("quantity") + returned[stock_id])
+            StockReservation.objects.filter(pk__in=[row[0] for row in batch]).update(status="released")
+            Order.objects.filter(pk__in={row[2] for row in batch}, status="pending").exclude(
+                reservations__status="committed"
+            ).update(status="cancelled")
+            released += len(batch)
+    return released
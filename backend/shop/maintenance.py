@@ -0,0 +1,57 @@
+import time
+
+from django.db import connection, transaction
+
+
+def iter_pk_batches(queryset, batch_size):
+    """Yield lists of primary keys from queryset using keyset pagination on pk."""
+    last_pk = None
+    while True:
+        batch_qs = queryset.order_by("pk")
+        if last_pk is not None:
+            batch_qs = batch_qs.filter(pk__gt=last_pk)
+        pks = list(batch_qs.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def estimate_rows_bytes(model, values, field=None):
+    """Return the on-disk size of the rows where field (pk by default) is in values, or None if unknown."""
+    if connection.vendor != "postgresql" or not values:
+        return None
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = (model._meta.get_field(field) if field else model._meta.pk).column
+    column = connection.ops.quote_name(column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COALESCE(SUM(pg_column_size(t.*)), 0) FROM {table} t WHERE t.{column} = ANY(%s)",
+            [list(values)],
+        )
+        return cursor.fetchone()[0]
+
+
+def delete_in_batches(queryset, batch_size=500, sleep=0, dry_run=False):
+    """Delete rows matched by queryset in small transactions, return (rows, bytes)."""
+    model = queryset.model
+    rows = 0
+    size = 0
+    for pks in iter_pk_batches(queryset, batch_size):
+        with transaction.atomic():
+            size += estimate_rows_bytes(model, pks) or 0
+            if dry_run:
+                rows += len(pks)
+            else:
+                rows += queryset.filter(pk__in=pks).delete()[0]
+        if sleep:
+            time.sleep(sleep)
+    return rows, size
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
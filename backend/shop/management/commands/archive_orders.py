@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.archive import archive_orders
+from shop.maintenance import iter_pk_batches
+from shop.models import Order
+
+
+class Command(BaseCommand):
+    help = "Move orders older than the archive horizon to the archive tables in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER.days,
+            help="Archive orders older than this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--sleep", type=float, default=0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        archived = 0
+        for order_ids in iter_pk_batches(Order.objects.filter(created_at__lt=cutoff), options["batch_size"]):
+            archived += archive_orders(order_ids, cutoff)
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders created before {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.bench import http_load, summarize
+
+SERVERS = {
+    "wsgi": (
+        "gunicorn (sync views)",
+        "/api/v1/",
+        lambda workers, port: ["-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}", "lingerie_shop.wsgi"],
+    ),
+    "asgi": (
+        "uvicorn (async views)",
+        "/api/v1/async/",
+        lambda workers, port: [
+            "-m", "uvicorn", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+            "--no-access-log", "lingerie_shop.asgi:application",
+        ],
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with the sync DRF views and uvicorn with the async views, each with the same "
+        "number of workers, and compare requests/sec and latency percentiles on the catalog endpoints. "
+        "The async views do not use the catalog cache, so both servers run with it off. "
+        "Seed the database with catalog data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--port", type=int, default=8901)
+        parser.add_argument(
+            "--paths", nargs="+", default=["products/", "products/search/", "collections/", "categories/"],
+            help="Endpoint paths relative to the API prefix.",
+        )
+        parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, CATALOG_CACHE_TTL="0", WARM_CACHES="false")
+        self.stdout.write(f"{'server':<24} {'req/s':>8} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name in options["servers"]:
+            label, prefix, command = SERVERS[name]
+            port = options["port"]
+            # A file rather than a pipe: nobody reads the server's log while it runs, and a full
+            # pipe would block its workers.
+            log = tempfile.TemporaryFile()
+            process = subprocess.Popen(
+                [sys.executable, *command(options["workers"], port)],
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+            )
+            try:
+                base = f"http://127.0.0.1:{port}{prefix}"
+                self.wait_until_ready(process, log, base + options["paths"][0])
+                urls = [base + path for path in options["paths"]]
+                # Warm up imports, connections and caches in every worker before measuring.
+                http_load(urls, options["concurrency"], options["concurrency"] * 4)
+                latencies, errors, elapsed = http_load(urls, options["concurrency"], options["requests"])
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+                log.close()
+
+            stats = summarize(latencies)
+            self.stdout.write(
+                f"{label:<24} {len(latencies) / elapsed:8.1f} {stats['mean_ms']:9.1f} "
+                f"{stats['p50_ms']:9.1f} {stats['p99_ms']:9.1f} {len(errors):7d}"
+            )
+            for error in errors[:5]:
+                self.stderr.write(f"  {error}")
+
+    def wait_until_ready(self, process, log, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                output = log.read().decode(errors="replace")[-2000:]
+                raise CommandError(f"Server exited with code {process.returncode}: {output}")
+            try:
+                requests.get(url, timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise CommandError(f"Server did not answer on {url} within {timeout}s.")
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from shop.bench import summarize, timer
+from shop.models import Cart, CartItem, Product
+from shop.views import OrderViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark checkout latency for carts of different sizes. All data is rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50])
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # The "order" throttle scope allows a client far fewer checkouts than one run sends.
+        unthrottled = mock.patch.object(OrderViewSet, "throttle_classes", ())
+        try:
+            with unthrottled, transaction.atomic():
+                self.run(options["sizes"], options["iterations"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, iterations):
+        user = get_user_model().objects.create_user(
+            email="bench-checkout@example.com",
+            password="bench-password",
+            first_name="Bench",
+            last_name="Checkout",
+            phone="+000000000",
+        )
+        products = Product.objects.bulk_create(
+            Product(title=f"Bench checkout {i}", description="Benchmark product", price="19.99", code=f"BCH{i:05d}")
+            for i in range(max(sizes))
+        )
+        cart = Cart.objects.create(user=user)
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+        payload = {
+            "delivery_method": "courier",
+            "payment_method": "cash",
+            "delivery_address": {
+                "postal_code": "00000",
+                "country": "Benchmark",
+                "city": "Benchmark",
+                "street_address": "1 Benchmark street",
+            },
+        }
+
+        self.stdout.write(f"{'lines':>6} {'queries':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for size in sizes:
+            latencies = []
+            queries = 0
+            for _ in range(iterations):
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product=product, quantity=2) for product in products[:size]
+                )
+                with CaptureQueriesContext(connection) as captured, timer(latencies):
+                    response = client.post("/api/v1/order/create/", payload, format="json")
+                if response.status_code >= 400:
+                    self.stderr.write(f"Checkout failed with {response.status_code}: {response.content[:200]}")
+                    return
+                queries = len(captured)
+            stats = summarize(latencies)
+            self.stdout.write(
+                f"{size:>6} {queries:>8} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+                f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+            )
@@ -0,0 +1,136 @@
+import json
+import logging
+import platform
+import subprocess
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from shop.bench import SCENARIOS, Catalog, compare, run_in_process, run_over_http
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the list, search, detail, cart add and checkout endpoints on a seeded database "
+        "(see seed_catalog) and report throughput, latency percentiles and query counts. "
+        "Save a run with --output and compare a later one against it with --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument("--iterations", type=int, default=200, help="Timed requests per scenario.")
+        parser.add_argument(
+            "--warmup", type=int, default=20, help="Unrecorded iterations per scenario to warm imports and caches.",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Seeds which products and filters are requested.")
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server to load instead of using the test client, e.g. http://127.0.0.1:8000. "
+                 "Its writes are committed. SQLite serializes writers, so concurrent checkouts need PostgreSQL.",
+        )
+        parser.add_argument("--concurrency", type=int, default=16, help="Client threads with --url.")
+        parser.add_argument(
+            "--cache", choices=("cold", "warm"), default="cold",
+            help="cold measures the views with the catalog cache off, warm serves cacheable pages from it. "
+                 "With --url the server's own CATALOG_CACHE_TTL decides.",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="JSON results of an earlier run to compare with.")
+        parser.add_argument(
+            "--threshold", type=float, default=10,
+            help="Percent by which p95/p99 may grow or throughput drop before --baseline fails the run.",
+        )
+
+    def handle(self, *args, **options):
+        catalog = Catalog.load()
+        if not catalog.products or not catalog.categories or not catalog.brands:
+            raise CommandError("The catalog is empty; run seed_catalog first.")
+        # One log line per request would drown the report.
+        logging.getLogger("lingerie_shop.requests").setLevel(logging.WARNING)
+
+        if options["url"]:
+            results = self.run(catalog, options, lambda name, iterations: run_over_http(
+                name, iterations, options["seed"], catalog, options["url"].rstrip("/"), options["concurrency"],
+            ))
+        else:
+            # Everything the test client writes is rolled back.
+            cache = override_settings(CATALOG_CACHE_TTL=timedelta(0)) if options["cache"] == "cold" else nullcontext()
+            try:
+                with cache, transaction.atomic():
+                    results = self.run(catalog, options, lambda name, iterations: run_in_process(
+                        name, iterations, options["seed"], catalog,
+                    ))
+                    raise Rollback
+            except Rollback:
+                pass
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump({"meta": self.meta(options, catalog), "results": results}, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["threshold"])
+
+    def run(self, catalog, options, run_scenario):
+        self.stdout.write(
+            f"{'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}"
+        )
+        results = {}
+        for name in options["scenarios"]:
+            if options["warmup"]:
+                run_scenario(name, options["warmup"])
+            stats, errors = run_scenario(name, options["iterations"])
+            results[name] = stats
+            queries = "-" if stats["queries"] is None else f"{stats['queries']:g}"
+            self.stdout.write(
+                f"{name:<16} {stats['throughput_rps']:8.1f} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+                f"{stats['p99_ms']:8.2f} {queries:>8} {stats['errors']:7d}"
+            )
+            for error in errors[:3]:
+                self.stderr.write(f"  {error}")
+        return results
+
+    def compare(self, results, path, threshold):
+        with open(path) as file:
+            baseline = json.load(file)
+        rows, regressions = compare(results, baseline["results"], threshold)
+        commit = baseline["meta"].get("commit") or "unknown commit"
+        self.stdout.write(f"\nCompared with {path} ({commit}):")
+        self.stdout.write(f"{'scenario':<16} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, metric, old, new, change in rows:
+            line = f"{name:<16} {metric:<15} {old:10.2f} {new:10.2f} {change:+7.1f}%"
+            self.stdout.write(self.style.ERROR(line) if (name, metric, old, new, change) in regressions else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} metrics regressed beyond {threshold:g}%.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def meta(self, options, catalog):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            "commit": commit,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "mode": "http" if options["url"] else "in-process",
+            "url": options["url"],
+            "cache": None if options["url"] else options["cache"],
+            "concurrency": options["concurrency"] if options["url"] else 1,
+            "iterations": options["iterations"],
+            "warmup": options["warmup"],
+            "seed": options["seed"],
+            "database": connection.vendor,
+            "products": len(catalog.products),
+            "python": platform.python_version(),
+        }
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from shop.bench import summarize, timer
+from shop.counters import fold_sales_counters, increment_sales, with_total_sales
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent sales_counter increments on one product row against sharded counters. "
+        "Each transaction holds its lock for --hold-ms to mimic the rest of checkout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--increments", type=int, default=20, help="Increments per thread.")
+        parser.add_argument("--hold-ms", type=float, default=5)
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(
+            title=f"Bench counter {time.time_ns()}", description="Benchmark product", price="9.99"
+        )
+        try:
+            for mode, increment in (
+                ("single row", lambda: Product.objects.filter(pk=product.pk).update(
+                    sales_counter=F("sales_counter") + 1
+                )),
+                ("sharded", lambda: increment_sales({product.pk: 1})),
+            ):
+                self.run(mode, increment, product, options)
+        finally:
+            product.delete()
+
+    def run(self, mode, increment, product, options):
+        Product.objects.filter(pk=product.pk).update(sales_counter=0)
+        hold = options["hold_ms"] / 1000
+        latencies = []
+
+        def worker(_):
+            try:
+                for _ in range(options["increments"]):
+                    with timer(latencies), transaction.atomic():
+                        increment()
+                        time.sleep(hold)
+            finally:
+                connection.close()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(worker, range(options["threads"])))
+        elapsed = time.perf_counter() - began
+
+        fold_sales_counters()
+        total = with_total_sales(Product.objects.filter(pk=product.pk)).get().total_sales
+        expected = options["threads"] * options["increments"]
+        stats = summarize(latencies)
+        self.stdout.write(
+            f"{mode:>10}: {expected / elapsed:8.1f} increments/s "
+            f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms total={total}/{expected}"
+        )
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+
+from shop.bench import summarize, timer
+from shop.inventory import OutOfStock, reserve_stock
+from shop.models import Address, Order, Product, StockItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Run many concurrent checkouts against one hot SKU and check that stock is never oversold. "
+        "Meant for PostgreSQL; SQLite serializes writers and will report lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=200)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--quantity", type=int, default=1, help="Units taken by each checkout.")
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(
+            title=f"Bench stock {time.time_ns()}", description="Benchmark product", price="9.99"
+        )
+        stock = StockItem.objects.create(product=product, quantity=options["stock"])
+        line = SimpleNamespace(product_id=product.id, size_id=None, color_id=None, quantity=options["quantity"])
+        results = {"reserved": 0, "out_of_stock": 0, "errors": 0}
+        lock = threading.Lock()
+        latencies = []
+        start = threading.Event()
+
+        def checkout(_):
+            start.wait()
+            try:
+                with timer(latencies), transaction.atomic():
+                    address = Address.objects.create(
+                        postal_code="00000", country="Benchmark", city="Benchmark", street_address="Bench"
+                    )
+                    order = Order.objects.create(
+                        delivery_address=address, delivery_method="courier", payment_method="cash"
+                    )
+                    reserve_stock(order, [line])
+                outcome = "reserved"
+            except OutOfStock:
+                outcome = "out_of_stock"
+            except DatabaseError as error:
+                self.stderr.write(f"{type(error).__name__}: {error}")
+                outcome = "errors"
+            finally:
+                connection.close()
+            with lock:
+                results[outcome] += 1
+
+        began = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                futures = [pool.submit(checkout, i) for i in range(options["threads"])]
+                start.set()
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - began
+
+            stock.refresh_from_db()
+            stats = summarize(latencies)
+            sold = results["reserved"] * options["quantity"]
+            self.stdout.write(
+                f"threads={options['threads']} reserved={results['reserved']} "
+                f"out_of_stock={results['out_of_stock']} errors={results['errors']} "
+                f"remaining={stock.quantity} throughput={options['threads'] / elapsed:.1f}/s "
+                f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+            )
+            if sold + stock.quantity != options["stock"]:
+                self.stderr.write(self.style.ERROR("Stock accounting mismatch: units were oversold or lost."))
+            else:
+                self.stdout.write(self.style.SUCCESS("No overselling detected."))
+        finally:
+            order_ids = list(Order.objects.filter(reservations__stock_item=stock).values_list("id", flat=True))
+            Address.objects.filter(order__id__in=order_ids).delete()
+            product.delete()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop.counters import fold_sales_counters
+
+
+class Command(BaseCommand):
+    help = "Fold sharded sales counts back into Product.sales_counter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Products folded per transaction.")
+
+    def handle(self, *args, **options):
+        folded = fold_sales_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Folded sales counters for {folded} products."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lingerie_shop.schema import write_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served by /swagger.json/, /swagger/ and /redoc/ into OPENAPI_SCHEMA_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Write here instead of OPENAPI_SCHEMA_DIR.")
+
+    def handle(self, *args, **options):
+        for path in write_schema(options["output_dir"]):
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
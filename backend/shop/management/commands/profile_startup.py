@@ -0,0 +1,89 @@
+import json
+import platform
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lingerie_shop.startup import LAZY_MODULES, compare, profile_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the application in fresh interpreters with -X importtime and report the boot time and the "
+        "slowest imports. Save a run with --output and compare a later one against it with --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Boots to measure.")
+        parser.add_argument("--top", type=int, default=25, help="Modules and packages to list.")
+        parser.add_argument("--output", help="Write the profile as JSON to this file.")
+        parser.add_argument("--baseline", help="JSON profile of an earlier run to compare with.")
+        parser.add_argument(
+            "--threshold", type=float, default=10,
+            help="Percent by which the median boot or import time may grow before --baseline fails the run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        try:
+            profile = profile_startup(options["repeat"])
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        boot = profile["boot_ms"]
+        self.stdout.write(
+            f"Boot over {options['repeat']} runs: min {boot['min']:.1f} ms, median {boot['median']:.1f} ms, "
+            f"max {boot['max']:.1f} ms; {profile['import_ms']:.1f} ms importing {profile['module_count']} modules."
+        )
+        self.stdout.write(f"\n{'module':<56} {'self ms':>8} {'total ms':>9}")
+        slowest = sorted(profile["modules"].items(), key=lambda item: -item[1][1])
+        # Only top-level imports: a package's total already includes its submodules.
+        for name, (own, cumulative, _) in [item for item in slowest if item[1][2] == 0][:options["top"]]:
+            self.stdout.write(f"{name:<56} {own:8.1f} {cumulative:9.1f}")
+        self.stdout.write(f"\n{'package':<56} {'self ms':>8}")
+        for name, own in sorted(profile["packages"].items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"{name:<56} {own:8.1f}")
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump({"meta": self.meta(options), **profile}, file, indent=2)
+            self.stdout.write(f"\nProfile written to {options['output']}.")
+        if options["baseline"]:
+            self.compare(profile, options["baseline"], options["threshold"])
+        if profile["eager"]:
+            raise CommandError("Imported at boot but meant to load lazily: " + ", ".join(
+                f"{name} (for {LAZY_MODULES[name]})" for name in profile["eager"]
+            ))
+
+    def compare(self, profile, path, threshold):
+        with open(path) as file:
+            baseline = json.load(file)
+        rows, regressions = compare(profile, baseline, threshold)
+        commit = baseline["meta"].get("commit") or "unknown commit"
+        self.stdout.write(f"\nCompared with {path} ({commit}):")
+        self.stdout.write(f"{'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+        for row in rows:
+            metric, old, new, change = row
+            line = f"{metric:<16} {old:10.1f} {new:10.1f} {change:+7.1f}%"
+            self.stdout.write(self.style.ERROR(line) if row in regressions else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} metrics regressed beyond {threshold:g}%.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            "commit": commit,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": options["repeat"],
+            "settings": settings.SETTINGS_MODULE,
+            "python": platform.python_version(),
+        }
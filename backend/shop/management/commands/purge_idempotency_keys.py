@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from shop.maintenance import delete_in_batches, format_bytes
+from shop.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, **options):
+        rows, size = delete_in_batches(
+            IdempotencyKey.objects.filter(expires_at__lt=timezone.now()),
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+        )
+        message = f"Deleted {rows} expired idempotency keys"
+        if connection.vendor == "postgresql":
+            message += f" ({format_bytes(size)} reclaimed)"
+        self.stdout.write(self.style.SUCCESS(message + "."))
@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from shop.maintenance import (
+    delete_in_batches,
+    estimate_rows_bytes,
+    format_bytes,
+    iter_pk_batches,
+)
+from shop.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = "Delete anonymous carts idle longer than --days and expired sessions, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Idle age after which an anonymous cart is purged.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--sleep", type=float, default=0, help="Seconds to pause between batches.")
+        parser.add_argument("--skip-sessions", action="store_true", help="Do not purge expired sessions.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        stale_carts = Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff)
+
+        carts = items = size = 0
+        for pks in iter_pk_batches(stale_carts, options["batch_size"]):
+            with transaction.atomic():
+                # Re-apply the idle filter so carts touched since the batch was read survive.
+                pks = list(stale_carts.filter(pk__in=pks).values_list("pk", flat=True))
+                size += estimate_rows_bytes(Cart, pks) or 0
+                size += estimate_rows_bytes(CartItem, pks, field="cart") or 0
+                if options["dry_run"]:
+                    carts += len(pks)
+                    items += CartItem.objects.filter(cart_id__in=pks).count()
+                else:
+                    items += CartItem.objects.filter(cart_id__in=pks).delete()[0]
+                    carts += Cart.objects.filter(pk__in=pks).delete()[0]
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        sessions = 0
+        if not options["skip_sessions"] and settings.SESSION_ENGINE == "django.contrib.sessions.backends.db":
+            sessions, session_size = delete_in_batches(
+                Session.objects.filter(expire_date__lt=timezone.now()),
+                batch_size=options["batch_size"],
+                sleep=options["sleep"],
+                dry_run=options["dry_run"],
+            )
+            size += session_size
+
+        prefix = "Would delete" if options["dry_run"] else "Deleted"
+        message = f"{prefix} {carts} carts, {items} cart items and {sessions} expired sessions"
+        if connection.vendor == "postgresql":
+            message += f" ({format_bytes(size)} reclaimed)"
+        self.stdout.write(self.style.SUCCESS(message + "."))
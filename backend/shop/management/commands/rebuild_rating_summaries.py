@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute every product's rating histogram, review count and average from its comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Products rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_rating_summaries(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {rebuilt} products."))
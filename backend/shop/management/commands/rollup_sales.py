@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.rollups import backfill_range, rebuild_day, rollup_incremental, start_backfill
+
+
+class Command(BaseCommand):
+    help = "Roll up orders into daily sales aggregates, incrementally or as a parallel backfill."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Orders per incremental transaction.")
+        parser.add_argument("--backfill", action="store_true", help="Rebuild whole days instead of running incrementally.")
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First day to backfill.")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last day to backfill.")
+        parser.add_argument("--workers", type=int, default=4, help="Days rebuilt in parallel during a backfill.")
+
+    def handle(self, *args, **options):
+        if not options["backfill"]:
+            processed = rollup_incremental(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} orders."))
+            return
+
+        bounds = backfill_range()
+        if bounds is None:
+            self.stdout.write("No orders to backfill.")
+            return
+        date_from = options["date_from"] or bounds[0]
+        date_to = options["date_to"] or bounds[1]
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to.")
+
+        horizon = start_backfill()
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+        def rebuild(day):
+            try:
+                rebuild_day(day)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            list(pool.map(rebuild, days))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(days)} days of rollups up to order {horizon}. "
+            f"Run without --backfill to roll up newer orders."
+        ))
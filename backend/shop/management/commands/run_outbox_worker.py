@@ -0,0 +1,60 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from shop.outbox import claim_batch, process_batch
+
+
+class Command(BaseCommand):
+    help = "Claim outbox events in batches and dispatch them to the configured handlers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=1, help="Seconds to wait when idle.")
+        parser.add_argument("--stats-interval", type=float, default=60, help="Seconds between metric reports.")
+        parser.add_argument("--once", action="store_true", help="Drain due events and exit.")
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        totals = {"done": 0, "retried": 0, "dead": 0}
+        window = dict(totals)
+        window_started = time.monotonic()
+        busy = 0.0
+
+        while self.running:
+            close_old_connections()
+            started = time.monotonic()
+            events = claim_batch(options["batch_size"])
+            if events:
+                for name, count in zip(("done", "retried", "dead"), process_batch(events)):
+                    totals[name] += count
+                    window[name] += count
+                busy += time.monotonic() - started
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["poll_interval"])
+
+            elapsed = time.monotonic() - window_started
+            if elapsed >= options["stats_interval"]:
+                self.report(window, elapsed, busy)
+                window = dict.fromkeys(window, 0)
+                window_started = time.monotonic()
+                busy = 0.0
+
+        self.report(totals, None, None)
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def report(self, counts, elapsed, busy):
+        handled = sum(counts.values())
+        line = f"done={counts['done']} retried={counts['retried']} dead={counts['dead']}"
+        if elapsed:
+            line += f" throughput={handled / elapsed:.1f}/s utilization={busy / elapsed:.0%}"
+        self.stdout.write(line)
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.models import Product
+from shop.seeding import SEED_PASSWORD, CatalogSeeder, clear_seeded_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a synthetic catalog, users, comments, carts and orders for benchmarks. "
+        "The same --seed and sizes always generate the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=5_000)
+        parser.add_argument("--comments-per-product", type=float, default=3, help="Mean number of comments.")
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument("--carts", type=int, default=1_000, help="Carts of seeded users, at most one each.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=2_000, help="Rows inserted per statement.")
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete the existing catalog, all carts and orders and previously seeded users first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self.stdout.write("Deleting existing data...")
+            clear_seeded_data()
+        elif Product.objects.exists():
+            raise CommandError("The catalog is not empty; pass --clear to replace it.")
+        if options["products"] < 1 and (options["orders"] or options["carts"]):
+            raise CommandError("Orders and carts need at least one product.")
+
+        started = time.monotonic()
+        seeder = CatalogSeeder(seed=options["seed"], batch_size=options["batch_size"], log=self.stdout.write)
+        counts = seeder.seed(
+            products=options["products"],
+            users=options["users"],
+            comments_per_product=options["comments_per_product"],
+            orders=options["orders"],
+            carts=options["carts"],
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {summary} in {time.monotonic() - started:.1f}s. Seeded users log in with {SEED_PASSWORD!r}."
+        ))
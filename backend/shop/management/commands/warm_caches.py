@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.http.request import validate_host
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from lingerie_shop.schema import FORMATS, load_schema
+
+LOOKUP_ROUTES = ("shop:category-list", "shop:collection-list", "shop:color-list", "shop:size-list")
+
+
+def warm_url(url):
+    """
+    Run the view behind url as an anonymous GET and return (status, ms, next page URL).
+
+    The view is called directly: throttles would count the warm-up against a client
+    address and middleware would record it as traffic.
+    """
+    parts = urlsplit(url)
+    match = resolve(parts.path)
+    view = match.func.cls.as_view(
+        match.func.actions, **{**match.func.initkwargs, "authentication_classes": (), "throttle_classes": ()},
+    )
+    request = RequestFactory().get(
+        f"{parts.path}?{parts.query}" if parts.query else parts.path,
+        HTTP_HOST=parts.netloc, secure=parts.scheme == "https",
+    )
+    started = time.perf_counter()
+    try:
+        response = view(request, *match.args, **match.kwargs)
+    finally:
+        # Connections are per thread; the pool's threads end with the command.
+        connections.close_all()
+    elapsed = (time.perf_counter() - started) * 1000
+    data = response.data if response.status_code == 200 else None
+    next_url = data.get("next") if isinstance(data, dict) else None
+    return response.status_code, elapsed, next_url
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the catalog cache (product list pages, top sales and the category, collection, color and size "
+        "lists) and load the OpenAPI schema before the server takes traffic. Pages are rendered in parallel "
+        "as requested at CATALOG_WARM_URL. With WARM_CACHES=true gunicorn.conf.py runs this in the "
+        "server process on start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=settings.CATALOG_WARM_URL, help="Scheme and host the pages are requested at.")
+        parser.add_argument(
+            "--pages", type=int, default=settings.CATALOG_WARM_PAGES, help="Pages to fill per list.",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="Pages rendered at once.")
+
+    def handle(self, *args, **options):
+        if options["pages"] < 1 or options["workers"] < 1:
+            raise CommandError("--pages and --workers must be at least 1.")
+        started = time.perf_counter()
+        for format in FORMATS:
+            load_schema(format)
+
+        if not settings.CATALOG_CACHE_TTL:
+            self.stdout.write(self.style.WARNING("The catalog cache is disabled (CATALOG_CACHE_TTL=0)."))
+            return
+        verbose = options["verbosity"] > 0
+        if verbose and isinstance(caches[settings.CATALOG_CACHE], LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                "CATALOG_CACHE is in-process memory, so only this process is warmed; run this from the "
+                "server's start hooks (gunicorn.conf.py) or configure a shared cache."
+            ))
+
+        base = options["url"].rstrip("/")
+        if not validate_host(urlsplit(base).hostname or "", settings.ALLOWED_HOSTS):
+            raise CommandError(f"The host of {base} is not in ALLOWED_HOSTS.")
+        pages = {}
+        warmed = failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="warm-caches") as executor:
+            # Top sales serializes the whole catalog; start it first so the other pages render meanwhile.
+            url = base + reverse("shop:product-top-sales")
+            pending = {executor.submit(warm_url, url): (url, None)}
+            # Product list pages do not depend on each other, so they are all requested at once.
+            path = reverse("shop:product-list")
+            for page in range(1, options["pages"] + 1):
+                url = f"{base}{path}?page={page}" if page > 1 else base + path
+                pending[executor.submit(warm_url, url)] = (url, None)
+            # The short lists are followed through their next links.
+            for name in LOOKUP_ROUTES:
+                path = reverse(name)
+                pending[executor.submit(warm_url, base + path)] = (base + path, path)
+                pages[path] = 1
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, followed = pending.pop(future)
+                    status, elapsed, next_url = future.result()
+                    line = f"{status} {elapsed:8.1f} ms  {url}"
+                    if status == 200:
+                        warmed += 1
+                        if verbose:
+                            self.stdout.write(line)
+                    else:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(line))
+                    if followed and next_url and pages[followed] < options["pages"]:
+                        pages[followed] += 1
+                        pending[executor.submit(warm_url, next_url)] = (next_url, followed)
+
+        summary = f"Warmed {warmed} responses in {time.perf_counter() - started:.1f}s."
+        if failed:
+            raise CommandError(f"{summary} {failed} failed.")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Comment = apps.get_model("shop", "Comment")
+    Product.objects.update(reviews=0, rating=None)
+    stats = Comment.objects.values("product_id").annotate(
+        count=models.Count("id"), average=models.Avg("rating")
+    )
+    for row in stats:
+        Product.objects.filter(pk=row["product_id"]).update(
+            reviews=row["count"], rating=row["average"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0011_order_archive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="comment_product_newest_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["product", "-rating", "-created_at", "-id"],
+                name="comment_product_rating_idx",
+            ),
+        ),
+    ]
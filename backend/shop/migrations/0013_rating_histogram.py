@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+def backfill_histograms(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Comment = apps.get_model("shop", "Comment")
+    rows = Comment.objects.values("product_id", "rating").annotate(
+        count=models.Count("id")
+    )
+    for row in rows:
+        Product.objects.filter(pk=row["product_id"]).update(
+            **{f"rating_{row['rating']}_count": row["count"]}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0012_comment_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="rating",
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def commit_placed_reservations(apps, schema_editor):
+    # Every order written so far was placed by checkout; keep its stock.
+    StockReservation = apps.get_model("shop", "StockReservation")
+    StockReservation.objects.filter(status="reserved").exclude(order__status="cancelled").update(
+        status="committed"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0013_rating_histogram"),
+    ]
+
+    operations = [
+        migrations.RunPython(commit_placed_reservations, migrations.RunPython.noop),
+    ]
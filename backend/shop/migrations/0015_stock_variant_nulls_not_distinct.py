@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_variants(apps, schema_editor):
+    # Rows without size or color escaped the old constraint; keep the oldest of each
+    # variant with the summed quantity and move reservations onto it.
+    StockItem = apps.get_model("shop", "StockItem")
+    StockReservation = apps.get_model("shop", "StockReservation")
+    duplicates = (
+        StockItem.objects.values("product_id", "size_id", "color_id")
+        .annotate(rows=Count("id"), keep=Min("id"), total=Sum("quantity"))
+        .filter(rows__gt=1)
+    )
+    for variant in duplicates:
+        rows = StockItem.objects.filter(
+            product_id=variant["product_id"], size_id=variant["size_id"], color_id=variant["color_id"]
+        )
+        extra = rows.exclude(pk=variant["keep"])
+        StockReservation.objects.filter(stock_item__in=extra).update(stock_item_id=variant["keep"])
+        extra.delete()
+        StockItem.objects.filter(pk=variant["keep"]).update(quantity=variant["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0014_commit_placed_reservations"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_variants, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="stockitem",
+            name="unique_stock_variant",
+        ),
+        migrations.AddConstraint(
+            model_name="stockitem",
+            constraint=models.UniqueConstraint(
+                fields=("product", "size", "color"),
+                name="unique_stock_variant",
+                nulls_distinct=False,
+            ),
+        ),
+    ]
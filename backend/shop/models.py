@@ -2,6 +2,7 @@ import os
 import uuid
 
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 from lingerie_shop import settings
@@ -76,7 +77,8 @@ class Order(models.Model):
     email = models.EmailField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    status = models.CharField(max_length=20, choices=[("pending", "Pending"), ("completed", "Completed")],
+    status = models.CharField(max_length=20, choices=[("pending", "Pending"), ("completed", "Completed"),
+                                                      ("cancelled", "Cancelled")],
                               default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
     delivery_method = models.CharField(
@@ -103,6 +105,13 @@ class Order(models.Model):
             ("cash", "Cash"),
         ],
     )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+            models.Index(fields=["session_key", "-created_at"], name="order_session_created_idx"),
+        ]
+
     def __str__(self):
         return (f"Order {self.id} by"
                 f" {self.user.first_name} {self.user.last_name}")
@@ -111,6 +120,8 @@ class Order(models.Model):
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
     product = models.ForeignKey("Product", on_delete=models.CASCADE)
+    size = models.ForeignKey("Size", on_delete=models.SET_NULL, null=True, blank=True)
+    color = models.ForeignKey("Color", on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
@@ -133,16 +144,32 @@ class Cart(models.Model):
         unique=True,
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Cart for {self.user.username}"
 
 
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Load products and their images with each line and annotate line_total."""
+        return self.select_related("product", "size", "color").prefetch_related("product__images").annotate(
+            line_total=models.ExpressionWrapper(
+                models.F("quantity") * models.F("product__price"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey("Product", on_delete=models.CASCADE)
+    size = models.ForeignKey("Size", on_delete=models.CASCADE, null=True, blank=True)
+    color = models.ForeignKey("Color", on_delete=models.CASCADE, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.title} - {self.quantity}"
 
@@ -157,7 +184,12 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     reviews = models.IntegerField(default=0)
     is_sales = models.BooleanField(default=False)
-    rating = models.FloatField(null=True, blank=True)
+    rating = models.FloatField(null=True, blank=True, db_index=True)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     brand = models.ManyToManyField("Brand", blank=True)
     code = models.CharField(
         max_length=10,
@@ -174,14 +206,12 @@ class Product(models.Model):
         super().save(*args, **kwargs)
 
     def average_rating(self):
-        comments = self.comments.all()
-        if comments:
-            return round(sum(comment.rating for comment in comments) / len(comments), 1)
-        return None
+        if self.rating is None:
+            return None
+        return round(self.rating, 1)
 
-    def update_reviews_count(self):
-        self.reviews = self.comments.count()
-        self.save()
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f"rating_{stars}_count") for stars in range(5, 0, -1)}
 
     def __str__(self):
         return f"{self.title} ({self.code})"
@@ -226,5 +256,193 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "-created_at", "-id"], name="comment_product_newest_idx"),
+            models.Index(fields=["product", "-rating", "-created_at", "-id"], name="comment_product_rating_idx"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user} on {self.product.title}"
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=50)
+    owner = models.CharField(max_length=100)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "scope", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.owner})"
+
+
+class StockItem(models.Model):
+    product = models.ForeignKey(Product, related_name="stock", on_delete=models.CASCADE)
+    size = models.ForeignKey("Size", on_delete=models.CASCADE, null=True, blank=True)
+    color = models.ForeignKey("Color", on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # A variant without size or color is still one row per product.
+            models.UniqueConstraint(
+                fields=["product", "size", "color"], name="unique_stock_variant", nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.title} {self.size or '-'} / {self.color or '-'}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    stock_item = models.ForeignKey(StockItem, related_name="reservations", on_delete=models.CASCADE)
+    order = models.ForeignKey(Order, related_name="reservations", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=20,
+        choices=[("reserved", "Reserved"), ("committed", "Committed"), ("released", "Released")],
+        default="reserved",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.stock_item} for Order {self.order_id} ({self.status})"
+
+
+class SalesCounterShard(models.Model):
+    product = models.ForeignKey(Product, related_name="sales_shards", on_delete=models.CASCADE)
+    slot = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "slot"], name="unique_sales_counter_slot"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}[{self.slot}] = {self.count}"
+
+
+class OutboxEvent(models.Model):
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ("pending", "Pending"),
+            ("processing", "Processing"),
+            ("done", "Done"),
+            ("dead", "Dead"),
+        ],
+        default="pending",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "available_at"])]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
+
+
+class DailySalesRollup(models.Model):
+    DIMENSIONS = [
+        ("product", "Product"),
+        ("category", "Category"),
+        ("collection", "Collection"),
+        ("brand", "Brand"),
+        ("delivery_method", "Delivery method"),
+        ("payment_method", "Payment method"),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSIONS)
+    key = models.CharField(max_length=100)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "date", "key"], name="unique_daily_sales_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.key}: {self.revenue}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_order_id}"
+
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_orders",
+        null=True,
+        blank=True,
+    )
+    session_key = models.CharField(max_length=40, null=True, blank=True)
+    first_name = models.CharField(max_length=50, blank=True, null=True)
+    last_name = models.CharField(max_length=50, blank=True, null=True)
+    email = models.EmailField(blank=True, null=True)
+    phone = models.CharField(max_length=20, blank=True, null=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    delivery_method = models.CharField(max_length=50)
+    delivery_cost = models.DecimalField(max_digits=6, decimal_places=2)
+    payment_method = models.CharField(max_length=20)
+    postal_code = models.CharField(max_length=20)
+    country = models.CharField(max_length=100)
+    city = models.CharField(max_length=100)
+    street_address = models.CharField(max_length=255)
+    address_comment = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="archived_user_created_idx"),
+            models.Index(fields=["session_key", "-created_at"], name="archived_session_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id}"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name="items", on_delete=models.CASCADE)
+    product = models.ForeignKey("Product", on_delete=models.SET_NULL, null=True)
+    size = models.ForeignKey("Size", on_delete=models.SET_NULL, null=True, blank=True)
+    color = models.ForeignKey("Color", on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} in archived order {self.order_id}"
@@ -0,0 +1,105 @@
+import logging
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Order, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def publish(topic, payload):
+    """Record an event to be handled after the surrounding transaction commits."""
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+@lru_cache
+def get_handlers(topic):
+    return tuple(import_string(path) for path in settings.OUTBOX_HANDLERS.get(topic, ()))
+
+
+def claimable(now):
+    # Processing rows whose lease ran out belong to a worker that died mid-batch.
+    return OutboxEvent.objects.filter(
+        Q(status="pending") | Q(status="processing"),
+        available_at__lte=now,
+    ).order_by("id")
+
+
+def claim_batch(batch_size):
+    """Lease up to batch_size due events to this worker and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    lease = {
+        "status": "processing",
+        "claimed_by": token,
+        "available_at": now + settings.OUTBOX_LEASE,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                claimable(now).select_for_update(skip_locked=True).values_list("id", flat=True)[:batch_size]
+            )
+            OutboxEvent.objects.filter(id__in=ids).update(**lease)
+    else:
+        # SQLite has no row locks, but runs this single UPDATE as one serialized write.
+        OutboxEvent.objects.filter(
+            id__in=Subquery(claimable(now).values("id")[:batch_size])
+        ).update(**lease)
+    return list(OutboxEvent.objects.filter(claimed_by=token, status="processing").order_by("id"))
+
+
+def dispatch(event):
+    for handler in get_handlers(event.topic):
+        handler(event)
+
+
+def process_batch(events):
+    """Run handlers for claimed events and record the outcome, return (done, retried, dead)."""
+    done = retried = dead = 0
+    for event in events:
+        try:
+            dispatch(event)
+        except Exception as error:
+            logger.exception("Outbox event %s (%s) failed", event.id, event.topic)
+            event.last_error = f"{type(error).__name__}: {error}"
+            if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.status = "dead"
+                dead += 1
+            else:
+                event.status = "pending"
+                event.available_at = timezone.now() + timedelta(seconds=min(2 ** event.attempts, 3600))
+                retried += 1
+        else:
+            event.status = "done"
+            event.processed_at = timezone.now()
+            done += 1
+        event.claimed_by = ""
+    OutboxEvent.objects.bulk_update(
+        events, ["status", "attempts", "available_at", "claimed_by", "last_error", "processed_at"]
+    )
+    return done, retried, dead
+
+
+def log_event(event):
+    logger.info("Outbox event %s: %s %s", event.id, event.topic, event.payload)
+
+
+def send_order_confirmation(event):
+    # The order may have been archived or deleted since; there is nobody left to confirm to.
+    order = Order.objects.filter(pk=event.payload["order_id"]).first()
+    if order is not None and order.email:
+        send_mail(
+            subject=f"Order {order.id} confirmation",
+            message=f"Thank you for your order. Total: {order.total_price}.",
+            from_email=None,
+            recipient_list=[order.email],
+        )
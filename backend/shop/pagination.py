@@ -0,0 +1,133 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate by the values of the last row instead of an offset.
+
+    The ordering must end in a unique field (usually id) and, when merging several
+    querysets, use a single direction. Each page is a single indexed range scan no
+    matter how deep the client pages, and rows inserted while paging do not shift
+    later pages. Views may define `keyset_ordering` (or `get_keyset_ordering(request)`)
+    to override the default ordering.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_ordering(self, request, view):
+        if hasattr(view, "get_keyset_ordering"):
+            return view.get_keyset_ordering(request)
+        return getattr(view, "keyset_ordering", self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, obj, ordering):
+        values = [getattr(obj, field.lstrip("-")) for field in ordering]
+        # Keep full microsecond precision; DjangoJSONEncoder would round datetimes to milliseconds.
+        values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    @staticmethod
+    def after(ordering, values):
+        """Build (a < x) OR (a = x AND b < y) ... for the given ordering and cursor values."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Paginate several querysets sharing the same ordering as one merged sequence.
+
+        Each source contributes at most one page worth of rows, so the cost stays
+        bounded however the rows are spread across the sources.
+        """
+        self.request = request
+        ordering = self.get_ordering(request, view)
+        page_size = self.get_page_size(request)
+        values = self.decode_cursor(request, ordering)
+
+        rows = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*ordering)
+            if values is not None:
+                try:
+                    queryset = queryset.filter(self.after(ordering, values))
+                except (ValidationError, ValueError, TypeError):
+                    raise NotFound(self.invalid_cursor_message)
+            rows.extend(queryset[:page_size + 1])
+        if len(querysets) > 1:
+            fields = [field.lstrip("-") for field in ordering]
+            rows.sort(key=lambda obj: [getattr(obj, field) for field in fields], reverse=ordering[0].startswith("-"))
+
+        self.next_cursor = self.encode_cursor(rows[page_size - 1], ordering) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CommentPagination(KeysetPagination):
+    """Keyset pages of comments, newest first or highest rated first (?sort=rating)."""
+    orderings = {
+        "newest": ("-created_at", "-id"),
+        "rating": ("-rating", "-created_at", "-id"),
+    }
+
+    def get_ordering(self, request, view):
+        return self.orderings.get(request.query_params.get("sort"), self.orderings["newest"])
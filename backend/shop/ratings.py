@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Cast
+
+from .maintenance import iter_pk_batches
+from .models import Comment, Product
+
+STARS = range(1, 6)
+
+
+def average_expression():
+    """SQL expression for the mean rating computed from the histogram columns."""
+    weighted = sum((F(f"rating_{stars}_count") * stars for stars in STARS), Value(0))
+    return Case(
+        When(reviews=0, then=Value(None)),
+        default=Cast(weighted, FloatField()) / F("reviews"),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(product_id, stars, delta):
+    """Add delta reviews with the given stars to a product's histogram, count and average."""
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product_id)
+        products.update(**{
+            f"rating_{stars}_count": F(f"rating_{stars}_count") + delta,
+            "reviews": F("reviews") + delta,
+        })
+        # A second statement: within one UPDATE the expression would still see the old counts.
+        products.update(rating=average_expression())
+
+
+def rebuild_rating_summaries(batch_size=500):
+    """Recompute histograms, review counts and averages from comments, return products updated."""
+    updated = 0
+    for pks in iter_pk_batches(Product.objects.all(), batch_size):
+        histograms = defaultdict(dict)
+        rows = Comment.objects.filter(product_id__in=pks).values("product_id", "rating").annotate(count=Count("id"))
+        for row in rows:
+            histograms[row["product_id"]][row["rating"]] = row["count"]
+
+        products = list(Product.objects.filter(pk__in=pks).only("pk"))
+        for product in products:
+            histogram = histograms.get(product.pk, {})
+            for stars in STARS:
+                setattr(product, f"rating_{stars}_count", histogram.get(stars, 0))
+            product.reviews = sum(histogram.values())
+            product.rating = (
+                sum(stars * count for stars, count in histogram.items()) / product.reviews
+                if product.reviews else None
+            )
+        with transaction.atomic():
+            Product.objects.bulk_update(
+                products, ["reviews", "rating", *(f"rating_{stars}_count" for stars in STARS)]
+            )
+        updated += len(products)
+    return updated
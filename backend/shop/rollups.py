@@ -0,0 +1,202 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Brand,
+    Category,
+    Collection,
+    DailySalesRollup,
+    Order,
+    OrderItem,
+    Product,
+    RollupWatermark,
+)
+
+WATERMARK = "daily_sales"
+# pg_advisory_xact_lock key serializing incremental runs against backfilled days.
+ROLLUP_LOCK = 7_302_114
+
+ITEM_DIMENSIONS = {
+    "product": "product_id",
+    "category": "product__category",
+    "collection": "product__collection",
+    "brand": "product__brand",
+}
+ORDER_DIMENSIONS = ("delivery_method", "payment_method")
+LABEL_FIELDS = {
+    "product": (Product, "title"),
+    "category": (Category, "name"),
+    "collection": (Collection, "name"),
+    "brand": (Brand, "name"),
+}
+# Order model: its item model. Archived orders keep the fields the rollups read.
+ITEM_MODELS = {Order: OrderItem, ArchivedOrder: ArchivedOrderItem}
+
+
+def aggregate(orders):
+    """Aggregate live or archived orders into {(date, dimension, key): [orders, units, revenue]}."""
+    totals = defaultdict(lambda: [0, 0, Decimal("0")])
+    items = ITEM_MODELS[orders.model].objects.filter(order__in=orders).annotate(day=TruncDate("order__created_at"))
+
+    for dimension, path in ITEM_DIMENSIONS.items():
+        rows = (
+            items.filter(**{f"{path}__isnull": False})
+            .values("day", key=F(path))
+            .annotate(
+                orders=Count("order", distinct=True),
+                units=Sum("quantity"),
+                revenue=Sum(F("price") * F("quantity")),
+            )
+        )
+        for row in rows:
+            totals[(row["day"], dimension, str(row["key"]))] = [row["orders"], row["units"], row["revenue"]]
+
+    for dimension in ORDER_DIMENSIONS:
+        # Units come from a separate query: joining items here would repeat total_price per line.
+        rows = orders.annotate(day=TruncDate("created_at")).values("day", key=F(dimension)).annotate(
+            orders=Count("id"), revenue=Sum("total_price")
+        )
+        for row in rows:
+            total = totals[(row["day"], dimension, row["key"])]
+            total[0], total[2] = row["orders"], row["revenue"]
+        rows = items.values("day", key=F(f"order__{dimension}")).annotate(units=Sum("quantity"))
+        for row in rows:
+            totals[(row["day"], dimension, row["key"])][1] = row["units"]
+
+    return totals
+
+
+def merge(totals):
+    """Add aggregated totals onto the stored rollups."""
+    if not totals:
+        return
+    existing = {
+        (row.date, row.dimension, row.key): row
+        for row in DailySalesRollup.objects.select_for_update().filter(
+            date__in={date for date, _, _ in totals},
+            key__in={key for _, _, key in totals},
+        )
+    }
+    to_update, to_create = [], []
+    for (date, dimension, key), (orders, units, revenue) in totals.items():
+        row = existing.get((date, dimension, key))
+        if row is None:
+            to_create.append(DailySalesRollup(
+                date=date, dimension=dimension, key=key, orders=orders, units=units, revenue=revenue
+            ))
+        else:
+            row.orders += orders
+            row.units += units
+            row.revenue += revenue
+            to_update.append(row)
+    DailySalesRollup.objects.bulk_update(to_update, ["orders", "units", "revenue"], batch_size=500)
+    DailySalesRollup.objects.bulk_create(to_create, batch_size=500)
+
+
+def lock_rollups(shared=False):
+    """
+    Hold the rollup lock until the transaction ends.
+
+    Backfilled days share it so they rebuild in parallel; incremental runs and
+    start_backfill take it alone. SQLite already serializes writers.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT pg_advisory_xact_lock{'_shared' if shared else ''}(%s)", [ROLLUP_LOCK])
+
+
+def rollable_orders(model=Order):
+    # Orders younger than the lag may still be cancelled by an expiring stock reservation,
+    # and lower ids may still be committing, so they wait for a later run.
+    return model.objects.exclude(status="cancelled").filter(
+        created_at__lt=timezone.now() - settings.SALES_ROLLUP_LAG
+    )
+
+
+def rollup_incremental(batch_size=5000):
+    """Roll up orders past the watermark, batch_size orders per transaction, return the count."""
+    processed = 0
+    while True:
+        with transaction.atomic():
+            lock_rollups()
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+            ids = list(
+                Order.objects.filter(
+                    id__gt=watermark.last_order_id,
+                    created_at__lt=timezone.now() - settings.SALES_ROLLUP_LAG,
+                ).order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return processed
+            merge(aggregate(rollable_orders().filter(id__gte=ids[0], id__lte=ids[-1])))
+            watermark.last_order_id = ids[-1]
+            watermark.save(update_fields=["last_order_id", "updated_at"])
+            processed += len(ids)
+
+
+def rebuild_day(day):
+    """
+    Recompute one day's rollups from the orders up to the watermark.
+
+    Call start_backfill() first. The watermark is read under the rollup lock, so
+    orders merged by incremental runs since then are rebuilt rather than dropped.
+    Archived orders keep their ids, so the watermark applies to them too; a day can
+    be split between the live and archive tables while archive_orders runs.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    with transaction.atomic():
+        lock_rollups(shared=True)
+        horizon = RollupWatermark.objects.get(name=WATERMARK).last_order_id
+        DailySalesRollup.objects.filter(date=day).delete()
+        for model in ITEM_MODELS:
+            merge(aggregate(rollable_orders(model).filter(
+                id__lte=horizon, created_at__gte=start, created_at__lt=start + timedelta(days=1)
+            )))
+
+
+def backfill_range():
+    """Return the dates spanned by all live and archived orders, or None if there are none."""
+    bounds = [
+        model.objects.aggregate(first=Min("created_at"), last=Max("created_at")) for model in ITEM_MODELS
+    ]
+    firsts = [bound["first"] for bound in bounds if bound["first"] is not None]
+    if not firsts:
+        return None
+    last = max(bound["last"] for bound in bounds if bound["last"] is not None)
+    return timezone.localdate(min(firsts)), timezone.localdate(last)
+
+
+def start_backfill():
+    """
+    Pin the watermark for a backfill and return it.
+
+    A fresh watermark is moved to the newest rollable order, so days rebuilt by the
+    backfill and orders added later by incremental runs never overlap.
+    """
+    with transaction.atomic():
+        lock_rollups()
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        if not watermark.last_order_id:
+            watermark.last_order_id = (
+                Order.objects.filter(created_at__lt=timezone.now() - settings.SALES_ROLLUP_LAG)
+                .aggregate(last=Max("id"))["last"] or 0
+            )
+            watermark.save(update_fields=["last_order_id", "updated_at"])
+        return watermark.last_order_id
+
+
+def rollup_labels(dimension, keys):
+    """Map rollup keys to display names for one dimension."""
+    if dimension not in LABEL_FIELDS:
+        return {key: key for key in keys}
+    model, field = LABEL_FIELDS[dimension]
+    return {str(pk): label for pk, label in model.objects.filter(pk__in=keys).values_list("pk", field)}
@@ -0,0 +1,282 @@
+"""
+Generate a synthetic catalog with users, comments, carts and orders for benchmarks.
+
+All values come from one random.Random(seed) drawn in a fixed order, so the same
+seed and sizes produce the same data; only primary keys depend on the database's
+sequences. Rows are inserted with bulk_create in batches, which skips save() and
+signals, so the denormalized rating and sales columns are filled in and cached
+catalog pages invalidated at the end.
+"""
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+from .catalog_cache import CATALOG_MODELS, invalidate_catalog
+from .models import (
+    Address,
+    Brand,
+    Cart,
+    CartItem,
+    Category,
+    Collection,
+    Color,
+    Comment,
+    Order,
+    OrderItem,
+    Product,
+    ProductImage,
+    Size,
+)
+from .ratings import rebuild_rating_summaries
+from .signals import invalidate_catalog_cache, update_reviews_on_delete
+
+SEED_EMAIL_DOMAIN = "seed.example.com"
+SEED_PASSWORD = "seed-password"
+
+COLORS = ["Black", "White", "Ivory", "Nude", "Blush", "Red", "Burgundy", "Navy", "Emerald", "Lilac", "Leopard"]
+SIZES = ["XS", "S", "M", "L", "XL", "XXL", "70B", "75B", "75C", "80C", "85D"]
+CATEGORIES = [
+    "Bras", "Panties", "Bodysuits", "Lingerie sets", "Sleepwear", "Robes",
+    "Corsets", "Stockings", "Shapewear", "Swimwear", "Loungewear", "Accessories",
+]
+COLLECTIONS = [
+    "Spring bloom", "Midnight lace", "Bridal", "Everyday comfort", "Holiday", "Silk essentials",
+    "Sport", "Maternity", "Valentine's", "Summer beach", "Autumn velvet", "Limited edition",
+]
+BRAND_PARTS = (
+    ["Bella", "Luna", "Rosa", "Vera", "Amour", "Noir", "Silk", "Velvet", "Aurora", "Elle"],
+    ["Mode", "Atelier", "Intimates", "Lace", "Studio", "& Co", "Paris", "Milano"],
+)
+STYLES = ["Lace", "Satin", "Mesh", "Cotton", "Silk", "Velvet", "Seamless", "Embroidered", "Sheer", "Ribbed"]
+ITEMS = [
+    "bralette", "push-up bra", "balconette bra", "thong", "brief", "bodysuit", "chemise",
+    "slip dress", "robe", "pajama set", "garter belt", "corset", "teddy", "bikini",
+]
+FIRST_NAMES = ["Olena", "Anna", "Maria", "Sofia", "Iryna", "Kateryna", "Daria", "Oksana", "Emma", "Lucas", "Max", "Ivan"]
+LAST_NAMES = ["Koval", "Shevchenko", "Bondar", "Melnyk", "Tkachenko", "Smith", "Garcia", "Müller", "Rossi", "Novak"]
+CITIES = ["Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Warsaw", "Berlin", "Vienna"]
+COMMENTS = [
+    "Fits perfectly.", "Beautiful lace, runs a little small.", "Very comfortable for everyday wear.",
+    "Color is exactly like the photos.", "Fabric feels cheap.", "Bought a second one in another color.",
+    "Straps are too long for me.", "Great quality for the price.", "Arrived quickly, lovely packaging.",
+]
+
+
+def clear_seeded_data():
+    """Delete the whole catalog, all carts and orders, and the users created by seeding."""
+    # Without the per-row rating and cache receivers Django deletes in bulk; the products
+    # go too, and the catalog is invalidated once at the end.
+    receivers = [(update_reviews_on_delete, Comment)] + [(invalidate_catalog_cache, model) for model in CATALOG_MODELS]
+    for receiver, sender in receivers:
+        post_delete.disconnect(receiver, sender=sender)
+    try:
+        for model in (Comment, ProductImage, OrderItem, Order, Address, CartItem, Cart, Product):
+            model.objects.all().delete()
+        for model in (Brand, Category, Collection, Color, Size):
+            model.objects.all().delete()
+    finally:
+        for receiver, sender in receivers:
+            post_delete.connect(receiver, sender=sender)
+    invalidate_catalog()
+    get_user_model().objects.filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}").delete()
+
+
+def batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(start + batch_size, total)
+
+
+class CatalogSeeder:
+    def __init__(self, seed=42, batch_size=2000, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.product_ids = []
+        self.prices = []
+        self.user_ids = []
+        self.sold = defaultdict(int)
+
+    def seed(self, products, users, comments_per_product, orders, carts):
+        """Create everything and return {model name: rows created}."""
+        counts = {}
+        counts.update(self.seed_attributes())
+        counts["users"] = self.seed_users(users)
+        counts["products"], counts["images"], counts["comments"] = self.seed_products(products, comments_per_product)
+        counts["orders"], counts["order items"] = self.seed_orders(orders)
+        counts["carts"], counts["cart items"] = self.seed_carts(carts)
+        self.log("Updating sales counters and rating summaries...")
+        self.update_sales_counters()
+        rebuild_rating_summaries()
+        invalidate_catalog()
+        return counts
+
+    def seed_attributes(self):
+        rng = self.rng
+        brand_names = sorted({f"{first} {second}" for first in BRAND_PARTS[0] for second in BRAND_PARTS[1]})
+        self.brands = [b.id for b in Brand.objects.bulk_create(Brand(name=name) for name in brand_names)]
+        self.categories = [c.id for c in Category.objects.bulk_create(
+            Category(name=name, image=f"collections/seed-category-{index}.jpg") for index, name in enumerate(CATEGORIES)
+        )]
+        self.collections = [c.id for c in Collection.objects.bulk_create(
+            Collection(name=name, image=f"collections/seed-{index}.jpg") for index, name in enumerate(COLLECTIONS)
+        )]
+        self.colors = [c.id for c in Color.objects.bulk_create(Color(name=name) for name in COLORS)]
+        self.sizes = [s.id for s in Size.objects.bulk_create(Size(name=name) for name in SIZES)]
+        # Some brands sell far more products than others.
+        self.brand_weights = [rng.paretovariate(1.2) for _ in self.brands]
+        return {
+            "brands": len(self.brands),
+            "categories": len(self.categories),
+            "collections": len(self.collections),
+            "colors": len(self.colors),
+            "sizes": len(self.sizes),
+        }
+
+    def seed_users(self, total):
+        rng = self.rng
+        # Hashing once keeps seeding fast; every seeded user logs in with SEED_PASSWORD.
+        password = make_password(SEED_PASSWORD)
+        User = get_user_model()
+        for start, end in batches(total, self.batch_size):
+            created = User.objects.bulk_create(
+                User(
+                    email=f"user{n}@{SEED_EMAIL_DOMAIN}",
+                    password=password,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone=f"+1555{n:07d}",
+                )
+                for n in range(start, end)
+            )
+            self.user_ids += [user.id for user in created]
+        self.log(f"Created {total} users.")
+        return total
+
+    def seed_products(self, total, comments_per_product):
+        rng = self.rng
+        through = {
+            name: getattr(Product, name).through for name in ("brand", "category", "collection", "color", "size")
+        }
+        images = comments = 0
+        for start, end in batches(total, self.batch_size):
+            with transaction.atomic():
+                products = [
+                    Product(
+                        title=f"{rng.choice(STYLES)} {rng.choice(ITEMS)} {n:06d}",
+                        description=f"{rng.choice(STYLES)} {rng.choice(ITEMS)} from the seeded catalog.",
+                        price=Decimal(f"{rng.randint(9, 149)}.99"),
+                        is_sales=rng.random() < 0.15,
+                        available=rng.random() < 0.95,
+                        code=f"S{n:08d}",
+                    )
+                    for n in range(start, end)
+                ]
+                Product.objects.bulk_create(products)
+                self.product_ids += [product.id for product in products]
+                self.prices += [product.price for product in products]
+
+                links = defaultdict(list)
+                image_rows, comment_rows = [], []
+                for product in products:
+                    links["brand"].append((product.id, rng.choices(self.brands, self.brand_weights)[0]))
+                    for name, choices, low, high in (
+                        ("category", self.categories, 1, 2),
+                        ("collection", self.collections, 0, 2),
+                        ("color", self.colors, 1, 4),
+                        ("size", self.sizes, 2, 5),
+                    ):
+                        for value in rng.sample(choices, rng.randint(low, high)):
+                            links[name].append((product.id, value))
+                    for index in range(rng.randint(1, 4)):
+                        image_rows.append(ProductImage(
+                            product_id=product.id, image=f"products/seed/{product.code}-{index}.jpg", is_main=index == 0
+                        ))
+                    if self.user_ids:
+                        # Most products have a few reviews, a handful have many.
+                        for _ in range(min(int(rng.expovariate(1 / comments_per_product)), 200)):
+                            comment_rows.append(Comment(
+                                user_id=rng.choice(self.user_ids),
+                                product_id=product.id,
+                                text=rng.choice(COMMENTS),
+                                rating=rng.choices((1, 2, 3, 4, 5), (4, 5, 12, 30, 49))[0],
+                            ))
+
+                for name, rows in links.items():
+                    model = through[name]
+                    target = f"{name}_id"
+                    model.objects.bulk_create(model(product_id=product_id, **{target: value}) for product_id, value in rows)
+                ProductImage.objects.bulk_create(image_rows)
+                Comment.objects.bulk_create(comment_rows)
+                images += len(image_rows)
+                comments += len(comment_rows)
+            self.log(f"Created {end}/{total} products.")
+        return total, images, comments
+
+    def seed_orders(self, total):
+        rng = self.rng
+        items = 0
+        for start, end in batches(total, self.batch_size):
+            with transaction.atomic():
+                addresses = Address.objects.bulk_create(
+                    Address(
+                        postal_code=f"{rng.randint(1000, 99999):05d}",
+                        country="Ukraine",
+                        city=rng.choice(CITIES),
+                        street_address=f"{rng.randint(1, 200)} Seed street",
+                    )
+                    for _ in range(start, end)
+                )
+                orders, lines = [], []
+                for address in addresses:
+                    user_id = rng.choice(self.user_ids) if self.user_ids and rng.random() < 0.8 else None
+                    status = rng.choices(("completed", "pending", "cancelled"), (80, 12, 8))[0]
+                    order_lines = []
+                    for _ in range(rng.randint(1, 4)):
+                        index = rng.randrange(len(self.product_ids))
+                        order_lines.append((self.product_ids[index], rng.randint(1, 3), self.prices[index]))
+                        if status != "cancelled":
+                            self.sold[self.product_ids[index]] += order_lines[-1][1]
+                    orders.append(Order(
+                        user_id=user_id,
+                        session_key=None if user_id else f"seed{rng.getrandbits(64):016x}",
+                        status=status,
+                        delivery_method=rng.choice(("courier", "post_office", "international")),
+                        delivery_address=address,
+                        payment_method=rng.choice(("credit_card", "apple_pay", "google_pay", "cash")),
+                        total_price=sum(price * quantity for _, quantity, price in order_lines),
+                    ))
+                    lines.append(order_lines)
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(
+                    OrderItem(order_id=order.id, product_id=product_id, quantity=quantity, price=price)
+                    for order, order_lines in zip(orders, lines)
+                    for product_id, quantity, price in order_lines
+                )
+                items += sum(len(order_lines) for order_lines in lines)
+            self.log(f"Created {end}/{total} orders.")
+        return total, items
+
+    def seed_carts(self, total):
+        rng = self.rng
+        owners = rng.sample(self.user_ids, min(total, len(self.user_ids)))
+        with transaction.atomic():
+            carts = Cart.objects.bulk_create(Cart(user_id=user_id) for user_id in owners)
+            items = [
+                CartItem(cart_id=cart.id, product_id=product_id, quantity=rng.randint(1, 2))
+                for cart in carts
+                for product_id in rng.sample(self.product_ids, min(rng.randint(1, 5), len(self.product_ids)))
+            ]
+            CartItem.objects.bulk_create(items, batch_size=self.batch_size)
+        return len(carts), len(items)
+
+    def update_sales_counters(self):
+        Product.objects.bulk_update(
+            [Product(id=product_id, sales_counter=count) for product_id, count in self.sold.items()],
+            ["sales_counter"],
+            batch_size=self.batch_size,
+        )
@@ -1,3 +1,6 @@
+from decimal import Decimal
+
+from django.db.models import Prefetch
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -15,7 +18,10 @@ from .models import (
     Cart,
     CartItem,
     Address,
-    Comment
+    Comment,
+    DailySalesRollup,
+    ArchivedOrder,
+    ArchivedOrderItem
 )
 
 
@@ -82,9 +88,18 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    COMMENTS_PREVIEW = 3
+    # Views prefetch this so a page of products loads its latest comments in one windowed query.
+    latest_comments_prefetch = Prefetch(
+        "comments",
+        queryset=Comment.objects.select_related("user").order_by("-created_at", "-id")[:COMMENTS_PREVIEW],
+        to_attr="latest_comments",
+    )
+
     images = ProductImageSerializer(many=True, required=False)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments_summary = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    sales_counter = serializers.SerializerMethodField()
 
     collection = serializers.SlugRelatedField(
         many=True,
@@ -130,13 +145,27 @@ class ProductSerializer(serializers.ModelSerializer):
             "is_sales",
             "code",
             "available",
-            "comments",
+            "comments_summary",
             "sales_counter"
         )
 
     def get_average_rating(self, obj):
         return obj.average_rating()
 
+    def get_sales_counter(self, obj):
+        # Views annotate with_total_sales(); the column alone misses shard counts not folded yet.
+        return getattr(obj, "total_sales", obj.sales_counter)
+
+    def get_comments_summary(self, obj):
+        latest = getattr(obj, "latest_comments", None)
+        if latest is None:
+            latest = obj.comments.select_related("user").order_by("-created_at", "-id")[:self.COMMENTS_PREVIEW]
+        return {
+            "count": obj.reviews,
+            "rating_histogram": obj.rating_histogram(),
+            "latest": CommentSerializer(latest, many=True).data,
+        }
+
     def create(self, validated_data):
         images_data = validated_data.pop("images", [])
         product = Product.objects.create(**validated_data)
@@ -165,22 +194,46 @@ class ProductListSerializer(ProductSerializer):
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductListSerializer()
+    size = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    color = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    line_total = serializers.SerializerMethodField()
 
     class Meta:
         model = CartItem
-        fields = ("id", "product", "quantity")
+        fields = ("id", "product", "size", "color", "quantity", "line_total")
+
+    def get_line_total(self, obj):
+        line_total = getattr(obj, "line_total", None)
+        if line_total is None:
+            line_total = obj.product.price * obj.quantity
+        return str(Decimal(line_total).quantize(Decimal("0.01")))
 
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
+    subtotal = serializers.SerializerMethodField()
+    item_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ("id", "items", "created_at")
+        fields = ("id", "items", "subtotal", "item_count", "created_at")
+
+    def get_subtotal(self, obj):
+        subtotal = sum(
+            (getattr(item, "line_total", None) or item.product.price * item.quantity
+             for item in obj.items.all()),
+            Decimal("0.00"),
+        )
+        return str(subtotal.quantize(Decimal("0.01")))
+
+    def get_item_count(self, obj):
+        return sum(item.quantity for item in obj.items.all())
 
 
 class AddToCartSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
+    size = serializers.PrimaryKeyRelatedField(queryset=Size.objects.all(), required=False, allow_null=True)
+    color = serializers.PrimaryKeyRelatedField(queryset=Color.objects.all(), required=False, allow_null=True)
     quantity = serializers.IntegerField(min_value=1)
 
     def validate_product_id(self, value):
@@ -191,10 +244,12 @@ class AddToCartSerializer(serializers.Serializer):
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductListSerializer()
+    size = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    color = serializers.SlugRelatedField(slug_field="name", read_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ("id", "product", "quantity", "price")
+        fields = ("id", "product", "size", "color", "quantity", "price")
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -206,6 +261,7 @@ class AddressSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
     delivery_address = AddressSerializer()
+    items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
@@ -223,6 +279,7 @@ class OrderSerializer(serializers.ModelSerializer):
             "delivery_cost",
             "payment_method",
             "created_at",
+            "items",
         ]
         read_only_fields = ["user", "total_price", "status", "created_at"]
 
@@ -237,6 +294,61 @@ class OrderSerializer(serializers.ModelSerializer):
         return data
 
 
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product = ProductListSerializer(allow_null=True)
+    size = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    color = serializers.SlugRelatedField(slug_field="name", read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ("id", "product", "size", "color", "quantity", "price")
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    created_at = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
+    delivery_address = serializers.SerializerMethodField()
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    archived = serializers.BooleanField(default=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            "id",
+            "user",
+            "first_name",
+            "last_name",
+            "email",
+            "phone",
+            "total_price",
+            "status",
+            "delivery_method",
+            "delivery_address",
+            "delivery_cost",
+            "payment_method",
+            "created_at",
+            "items",
+            "archived",
+        ]
+
+    def get_delivery_address(self, obj):
+        return {
+            "postal_code": obj.postal_code,
+            "country": obj.country,
+            "city": obj.city,
+            "street_address": obj.street_address,
+            "comment": obj.address_comment,
+        }
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    created_at = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ["id", "total_price", "status", "item_count", "created_at"]
+
+
 class OrderContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
@@ -253,4 +365,15 @@ class OrderDeliverySerializer(serializers.ModelSerializer):
 class OrderPaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = ["payment_method"]
\ No newline at end of file
+        fields = ["payment_method"]
+
+
+class DailySalesRollupSerializer(serializers.ModelSerializer):
+    label = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DailySalesRollup
+        fields = ("date", "dimension", "key", "label", "orders", "units", "revenue")
+
+    def get_label(self, obj):
+        return self.context.get("labels", {}).get(obj.key, obj.key)
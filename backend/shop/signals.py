@@ -1,13 +1,43 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Comment
+from .catalog_cache import CATALOG_MODELS, invalidate_catalog
+from .models import Comment, Product
+from .ratings import apply_rating_delta
+
+
+@receiver(pre_save, sender=Comment)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Comment.objects.filter(pk=instance.pk).values_list(
+            "product_id", "rating"
+        ).first()
 
 
 @receiver(post_save, sender=Comment)
-def update_reviews_on_save(sender, instance, **kwargs):
-    instance.product.update_reviews_count()
+def update_reviews_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+    current = (instance.product_id, instance.rating)
+    if previous == current:
+        return
+    if previous:
+        apply_rating_delta(*previous, -1)
+    apply_rating_delta(*current, 1)
 
 
 @receiver(post_delete, sender=Comment)
 def update_reviews_on_delete(sender, instance, **kwargs):
-    instance.product.update_reviews_count()
+    apply_rating_delta(instance.product_id, instance.rating, -1)
+
+
+def invalidate_catalog_cache(sender, action=None, **kwargs):
+    # m2m_changed fires before and after each change; one invalidation is enough.
+    if action is None or action.startswith("post_"):
+        invalidate_catalog()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog_cache, sender=model)
+    post_delete.connect(invalidate_catalog_cache, sender=model)
+for field in ("brand", "category", "collection", "color", "size"):
+    m2m_changed.connect(invalidate_catalog_cache, sender=getattr(Product, field).through)
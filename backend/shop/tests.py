@@ -1,3 +1,768 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from lingerie_shop.testing import QueryBudgetMixin
+
+from .archive import archive_orders
+from .bench import SCENARIOS
+from .catalog_cache import invalidate_catalog
+from .counters import fold_sales_counters, increment_sales, with_total_sales
+from .inventory import release_expired_reservations
+from .models import (
+    Address,
+    ArchivedOrder,
+    Brand,
+    Cart,
+    CartItem,
+    Category,
+    Collection,
+    Comment,
+    DailySalesRollup,
+    Order,
+    OrderItem,
+    OutboxEvent,
+    Product,
+    ProductImage,
+    SalesCounterShard,
+    Size,
+    StockItem,
+    StockReservation,
+)
+from .outbox import claim_batch, get_handlers, process_batch, publish
+from .rollups import backfill_range, rebuild_day, rollup_incremental, start_backfill
+
+CHECKOUT = {
+    "delivery_method": "courier",
+    "payment_method": "cash",
+    "delivery_address": {"postal_code": "01001", "country": "Ukraine", "city": "Kyiv", "street_address": "1 Test street"},
+}
+
+
+def checkout(client, product, quantity=1, size=None, **headers):
+    """Put product in client's cart and place the order; return the order response."""
+    client.post(
+        "/api/v1/cart/add/", {"product_id": product.id, "quantity": quantity, "size": size and size.id}, format="json"
+    )
+    return client.post("/api/v1/order/", CHECKOUT, format="json", **headers)
+
+
+# Budgets are for cache misses.
+@override_settings(CATALOG_CACHE_TTL=timedelta(0))
+class ShopQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Keep the hot shop endpoints free of N+1 queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="budget@example.com",
+            password="budget-password",
+            first_name="Budget",
+            last_name="Test",
+            phone="+380000000001",
+        )
+        cls.brand = Brand.objects.create(name="Budget brand")
+        cls.category = Category.objects.create(name="Budget category")
+        Collection.objects.create(name="Budget collection")
+        cls.products = []
+        cls.add_products(3)
+
+    @classmethod
+    def add_products(cls, count):
+        for _ in range(count):
+            product = Product.objects.create(
+                title=f"Budget product {len(cls.products)}", description="Budget", price="10.00"
+            )
+            product.brand.add(cls.brand)
+            product.category.add(cls.category)
+            ProductImage.objects.create(product=product, image="products/budget.jpg", is_main=True)
+            Comment.objects.create(user=cls.user, product=product, text="Nice", rating=5)
+            cls.products.append(product)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def add_orders(self, count):
+        for _ in range(count):
+            address = Address.objects.create(
+                postal_code="00000", country="Budget", city="Budget", street_address="1 Budget street"
+            )
+            order = Order.objects.create(
+                user=self.user, delivery_address=address, delivery_method="courier", payment_method="cash"
+            )
+            OrderItem.objects.create(order=order, product=self.products[0], quantity=1, price="10.00")
+
+    def test_product_list(self):
+        self.assertQueryBudget(3, "get", "/api/v1/products/")
+        self.assertConstantQueries("get", "/api/v1/products/", lambda: self.add_products(5))
+
+    def test_product_search(self):
+        path = f"/api/v1/products/search/?brand={self.brand.id}"
+        self.assertQueryBudget(4, "get", path)
+        self.assertConstantQueries("get", path, lambda: self.add_products(5))
+
+    def test_product_detail(self):
+        self.assertQueryBudget(8, "get", f"/api/v1/products/{self.products[0].id}/")
+
+    def test_products_on_sale(self):
+        def add_sales():
+            self.add_products(5)
+            Product.objects.update(is_sales=True)
+
+        add_sales()
+        self.assertConstantQueries("get", "/api/v1/products/on-sales/", add_sales)
+
+    def test_product_comments(self):
+        path = f"/api/v1/products/{self.products[0].id}/comments/"
+        self.assertQueryBudget(2, "get", path)
+        for pk in ("0", "abc"):
+            self.assertEqual(self.client.get(f"/api/v1/products/{pk}/comments/").status_code, 404)
+
+    def test_collections_and_categories(self):
+        self.assertQueryBudget(2, "get", "/api/v1/collections/")
+        self.assertQueryBudget(2, "get", "/api/v1/categories/")
+
+    def test_cart(self):
+        self.client.force_authenticate(self.user)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+
+        def add_items():
+            for product in self.products[1:]:
+                CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+        self.assertQueryBudget(3, "get", "/api/v1/cart/")
+        self.assertConstantQueries("get", "/api/v1/cart/", add_items)
+
+    def test_order_list(self):
+        self.client.force_authenticate(self.user)
+        self.add_orders(2)
+        self.assertQueryBudget(3, "get", "/api/v1/order/")
+        self.assertConstantQueries("get", "/api/v1/order/", lambda: self.add_orders(5))
+
+
+class CatalogCacheTests(QueryBudgetMixin, TestCase):
+    """Serve repeated catalog reads from the cache until the catalog changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Cached product", description="Cached", price="10.00")
+        cls.category = Category.objects.create(name="Cached category")
+
+    def setUp(self):
+        self.client = APIClient()
+        invalidate_catalog()
+
+    def test_repeated_reads_run_no_queries(self):
+        for path in ("/api/v1/products/", "/api/v1/products/top-sales/", "/api/v1/categories/"):
+            first = self.client.get(path)
+            second = self.assertQueryBudget(0, "get", path)
+            self.assertEqual(second.json(), first.json())
+
+    def test_catalog_changes_invalidate(self):
+        filtered = f"/api/v1/products/?category={self.category.id}"
+        self.client.get("/api/v1/products/")
+        self.assertEqual(self.client.get(filtered).json()["count"], 0)
+        self.product.title = "Renamed product"
+        self.product.save()
+        self.assertEqual(self.client.get("/api/v1/products/").json()["results"][0]["title"], "Renamed product")
+        self.product.category.add(self.category)
+        self.assertEqual(self.client.get(filtered).json()["count"], 1)
+
+
+class StockReservationTests(TestCase):
+    """Reserve stock at checkout, keep it once the order is paid and release it when it is not."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Stocked product", description="Stocked", price="10.00")
+        cls.size = Size.objects.create(name="M")
+        cls.stock = StockItem.objects.create(product=cls.product, size=cls.size, quantity=3)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def expire_reservations(self):
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+    def pay(self, order_id):
+        return self.client.post(
+            f"/api/v1/order/{order_id}/set-payment/", {"payment_method": "credit_card"}, format="json"
+        )
+
+    def test_checkout_takes_stock_and_refuses_to_oversell(self):
+        self.assertEqual(checkout(self.client, self.product, 2, self.size).status_code, 201)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 1)
+
+        response = checkout(APIClient(), self.product, 2, self.size)
+        self.assertEqual(response.status_code, 400)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_paid_order_keeps_its_stock(self):
+        order_id = checkout(self.client, self.product, 2, self.size).data["id"]
+        self.assertEqual(self.pay(order_id).status_code, 200)
+        self.expire_reservations()
+
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(Order.objects.get(pk=order_id).status, "pending")
+        self.assertEqual(StockReservation.objects.get(order_id=order_id).status, "committed")
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 1)
+
+    def test_unpaid_order_expires(self):
+        order_id = checkout(self.client, self.product, 2, self.size).data["id"]
+        self.expire_reservations()
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(Order.objects.get(pk=order_id).status, "cancelled")
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 3)
+        self.assertEqual(self.pay(order_id).status_code, 400)
+        self.assertEqual(Order.objects.get(pk=order_id).payment_method, "cash")
+
+
+class SalesRollupTests(TestCase):
+    """Aggregate daily sales incrementally, and from live and archived orders alike on backfills."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Rolled product", description="Rolled", price="10.00")
+        cls.created_at = timezone.now() - timedelta(days=400)
+        cls.orders = [cls.place_order(quantity) for quantity in (1, 2)]
+        Order.objects.update(created_at=cls.created_at)
+
+    @classmethod
+    def place_order(cls, quantity, **fields):
+        address = Address.objects.create(postal_code="1", country="Ukraine", city="Kyiv", street_address="1")
+        order = Order.objects.create(
+            delivery_address=address, delivery_method="courier", payment_method="cash", **fields
+        )
+        OrderItem.objects.create(order=order, product=cls.product, quantity=quantity, price="10.00")
+        return order
+
+    def product_rollup(self):
+        rollup = DailySalesRollup.objects.get(dimension="product", key=str(self.product.id))
+        return rollup.orders, rollup.units, rollup.revenue
+
+    def test_incremental_runs_roll_up_each_order_once(self):
+        self.assertEqual(rollup_incremental(batch_size=1), 2)
+        self.assertEqual(rollup_incremental(), 0)
+        self.assertEqual(self.product_rollup(), (2, 3, 30))
+
+        cancelled = self.place_order(5, status="cancelled")
+        Order.objects.filter(pk=cancelled.pk).update(created_at=self.created_at)
+        # Younger than SALES_ROLLUP_LAG: left for a later run.
+        self.place_order(7)
+        self.assertEqual(rollup_incremental(), 1)
+        self.assertEqual(self.product_rollup(), (2, 3, 30))
+
+    def test_totals_are_for_admins(self):
+        rollup_incremental()
+        client = APIClient()
+        path = "/api/v1/analytics/sales/totals/?dimension=product"
+        self.assertEqual(client.get(path).status_code, 401)
+        client.force_authenticate(get_user_model()(is_staff=True))
+        self.assertEqual(client.get(path).json(), [{
+            "dimension": "product", "key": str(self.product.id), "label": "Rolled product",
+            "orders": 2, "units": 3, "revenue": "30.00",
+        }])
+
+    def test_backfill_includes_archived_orders(self):
+        archive_orders([self.orders[0].id], timezone.now())
+        day = timezone.localdate(self.created_at)
+        self.assertEqual(backfill_range(), (day, day))
+
+        start_backfill()
+        rebuild_day(day)
+        rollup = DailySalesRollup.objects.get(date=day, dimension="product", key=str(self.product.id))
+        self.assertEqual((rollup.orders, rollup.units, rollup.revenue), (2, 3, 30))
+        rollup = DailySalesRollup.objects.get(date=day, dimension="delivery_method", key="courier")
+        self.assertEqual((rollup.orders, rollup.units), (2, 3))
+
+    def test_backfill_keeps_orders_rolled_up_since_it_started(self):
+        start_backfill()
+        newer = self.place_order(4)
+        Order.objects.filter(pk=newer.pk).update(created_at=self.created_at)
+        self.assertEqual(rollup_incremental(), 1)
+
+        rebuild_day(timezone.localdate(self.created_at))
+        self.assertEqual(self.product_rollup(), (3, 7, 70))
+
+
+class SamePayloadMixin:
+    """Compare an async endpoint's response with its sync counterpart's."""
+
+    def assertSamePayload(self, path):
+        expected = self.client.get(f"/api/v1/{path}").json()
+        for link in ("next", "previous"):
+            if expected.get(link):
+                expected[link] = expected[link].replace("/api/v1/", "/api/v1/async/")
+        response = self.client.get(f"/api/v1/async/{path}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+
+
+@override_settings(CATALOG_CACHE_TTL=timedelta(0))
+class AsyncViewTests(SamePayloadMixin, TestCase):
+    """Answer the async catalog endpoints with the same payloads as the sync ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(12):
+            Category.objects.create(name=f"Category {index:02}")
+            Collection.objects.create(name=f"Collection {index:02}")
+
+    def test_lookup_lists_match_sync_pages(self):
+        for path in ("collections/", "categories/", "collections/?page=2", "categories/?page=2"):
+            self.assertSamePayload(path)
+        self.assertEqual(self.client.get("/api/v1/async/categories/?page=3").status_code, 404)
+
+
+@override_settings(CATALOG_CACHE_TTL=timedelta(0))
+class AsyncProductViewTests(SamePayloadMixin, TransactionTestCase):
+    """Answer the async product endpoints with the same payloads as the sync ones."""
+
+    # The list runs its page and count queries on worker threads, which cannot read
+    # rows inside an open test transaction.
+
+    def setUp(self):
+        self.product = Product.objects.create(title="Async product", description="Async", price="10.00")
+
+    def test_products_match_sync_payloads(self):
+        self.assertSamePayload("products/")
+        self.assertSamePayload(f"products/{self.product.pk}/")
+        self.assertEqual(self.client.get("/api/v1/async/products/?page=2").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/async/products/0/").status_code, 404)
+
+
+def failing_handler(event):
+    raise RuntimeError("handler failed")
+
+
+@override_settings(OUTBOX_HANDLERS={
+    "order.created": ["shop.outbox.send_order_confirmation"],
+    "test.failing": ["shop.tests.failing_handler"],
+}, OUTBOX_MAX_ATTEMPTS=2)
+class OutboxTests(TestCase):
+    """Run the post-order side effects from the outbox."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Outbox product", description="Outbox", price="10.00")
+
+    def setUp(self):
+        get_handlers.cache_clear()
+        self.addCleanup(get_handlers.cache_clear)
+
+    def test_claimed_events_are_leased_to_one_worker(self):
+        events = [publish("test.noop", {"index": index}) for index in range(3)]
+        self.assertEqual([event.id for event in claim_batch(2)], [event.id for event in events[:2]])
+        self.assertEqual([event.id for event in claim_batch(10)], [events[2].id])
+        self.assertEqual(claim_batch(10), [])
+
+        # A worker that died mid-batch leaves its lease to run out.
+        OutboxEvent.objects.filter(pk=events[0].pk).update(available_at=timezone.now())
+        self.assertEqual([event.id for event in claim_batch(10)], [events[0].id])
+
+    def test_failures_are_retried_then_dead(self):
+        event = publish("test.failing", {})
+        with self.assertLogs("shop.outbox", "ERROR"):
+            self.assertEqual(process_batch(claim_batch(10)), (0, 1, 0))
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ("pending", 1))
+        self.assertEqual(event.last_error, "RuntimeError: handler failed")
+        self.assertGreater(event.available_at, timezone.now())
+
+        self.assertEqual(claim_batch(10), [])
+        OutboxEvent.objects.update(available_at=timezone.now())
+        with self.assertLogs("shop.outbox", "ERROR"):
+            self.assertEqual(process_batch(claim_batch(10)), (0, 0, 1))
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ("dead", 2))
+        self.assertEqual(claim_batch(10), [])
+
+    def test_order_confirmation_is_sent(self):
+        order_id = checkout(APIClient(), self.product).data["id"]
+        Order.objects.filter(pk=order_id).update(email="buyer@example.com")
+
+        self.assertEqual(process_batch(claim_batch(10)), (1, 0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertIn(f"Order {order_id}", mail.outbox[0].subject)
+
+
+class StaleCartPurgeTests(TestCase):
+    """Purge idle anonymous carts and expired sessions, and nothing else."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Carted product", description="Carted", price="10.00")
+        user = get_user_model().objects.create_user(
+            email="cart@example.com", password="x", first_name="Cart", last_name="Owner", phone="+380000000005"
+        )
+        long_ago = timezone.now() - timedelta(days=60)
+        cls.stale = [Cart.objects.create(session_key=f"stale-{index}") for index in range(3)]
+        cls.fresh = Cart.objects.create(session_key="fresh")
+        cls.owned = Cart.objects.create(user=user)
+        for cart in (*cls.stale, cls.fresh, cls.owned):
+            CartItem.objects.create(cart=cart, product=cls.product)
+        Cart.objects.exclude(pk=cls.fresh.pk).update(updated_at=long_ago)
+        Session.objects.create(session_key="expired", session_data="", expire_date=long_ago)
+        Session.objects.create(session_key="live", session_data="", expire_date=timezone.now() + timedelta(days=1))
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command("purge_stale_carts", "--batch-size", "2", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_deletes_nothing(self):
+        self.assertIn("Would delete 3 carts, 3 cart items and 1 expired sessions", self.purge("--dry-run"))
+        self.assertEqual(Cart.objects.count(), 5)
+
+    def test_purges_idle_anonymous_carts_and_expired_sessions(self):
+        self.assertIn("Deleted 3 carts, 3 cart items and 1 expired sessions", self.purge())
+        self.assertQuerySetEqual(Cart.objects.order_by("pk"), [self.fresh, self.owned])
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+class CartTotalsTests(TestCase):
+    """Return line totals, the subtotal and the item count with the cart."""
+
+    def test_totals(self):
+        client = APIClient()
+        shirt = Product.objects.create(title="Shirt", description="Shirt", price="12.50")
+        socks = Product.objects.create(title="Socks", description="Socks", price="3.99")
+        client.post("/api/v1/cart/add/", {"product_id": shirt.id, "quantity": 2}, format="json")
+        client.post("/api/v1/cart/add/", {"product_id": socks.id, "quantity": 3}, format="json")
+
+        cart = client.get("/api/v1/cart/").json()
+        self.assertEqual(
+            sorted((item["product"]["title"], item["quantity"], item["line_total"]) for item in cart["items"]),
+            [("Shirt", 2, "25.00"), ("Socks", 3, "11.97")],
+        )
+        self.assertEqual((cart["subtotal"], cart["item_count"]), ("36.97", 5))
+
+
+class CheckoutTests(TestCase):
+    """Place the whole cart as one order in a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(title=f"Checkout product {index}", description="Checkout", price=f"{index + 1}.00")
+            for index in range(4)
+        ]
+
+    def fill_cart(self, products):
+        client = APIClient()
+        for product in products:
+            client.post("/api/v1/cart/add/", {"product_id": product.id, "quantity": 2}, format="json")
+        return client
+
+    def test_order_takes_every_line_and_empties_the_cart(self):
+        client = self.fill_cart(self.products[:2])
+        response = client.post("/api/v1/order/", CHECKOUT, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.total_price, 6)
+        self.assertEqual(
+            sorted(order.items.values_list("product__title", "quantity", "price")),
+            [("Checkout product 0", 2, 1), ("Checkout product 1", 2, 2)],
+        )
+        self.assertEqual(client.get("/api/v1/cart/").json()["items"], [])
+        self.assertEqual(client.post("/api/v1/order/", CHECKOUT, format="json").status_code, 400)
+
+    def test_queries_do_not_grow_with_lines(self):
+        queries = []
+        for products in (self.products[:1], self.products):
+            client = self.fill_cart(products)
+            with CaptureQueriesContext(connection) as context:
+                response = client.post("/api/v1/order/", CHECKOUT, format="json")
+            self.assertEqual(response.status_code, 201)
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[1], queries[0])
+
+    def test_benchmark_runs_every_size(self):
+        out, err = StringIO(), StringIO()
+        # More checkouts than the "order" throttle scope allows a client per minute.
+        call_command("bench_checkout", "--iterations", "11", stdout=out, stderr=err)
+        self.assertEqual(err.getvalue(), "")
+        self.assertEqual([line.split()[0] for line in out.getvalue().splitlines()[1:]], ["1", "10", "50"])
+        self.assertFalse(Order.objects.exists())
+
+
+class IdempotencyTests(TestCase):
+    """Replay retried requests that carry the same Idempotency-Key instead of running them again."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Retried product", description="Retried", price="10.00")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_retried_checkout_replays_the_order(self):
+        first = checkout(self.client, self.product, HTTP_IDEMPOTENCY_KEY="checkout-1")
+        retry = self.client.post("/api/v1/order/", CHECKOUT, format="json", HTTP_IDEMPOTENCY_KEY="checkout-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_reused_key_with_another_body_conflicts(self):
+        checkout(self.client, self.product, HTTP_IDEMPOTENCY_KEY="checkout-1")
+        response = self.client.post(
+            "/api/v1/order/", {**CHECKOUT, "delivery_method": "pickup"}, format="json",
+            HTTP_IDEMPOTENCY_KEY="checkout-1",
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_retried_cart_add_counts_once(self):
+        data = {"product_id": self.product.id, "quantity": 2}
+        for _ in range(2):
+            self.client.post("/api/v1/cart/add/", data, format="json", HTTP_IDEMPOTENCY_KEY="add-1")
+        self.assertEqual(self.client.get("/api/v1/cart/").json()["item_count"], 2)
+        # Keys are per client: another cart may use the same one.
+        other = APIClient()
+        other.post("/api/v1/cart/add/", data, format="json", HTTP_IDEMPOTENCY_KEY="add-1")
+        self.assertEqual(other.get("/api/v1/cart/").json()["item_count"], 2)
+
+
+@override_settings(SALES_COUNTER_SHARDS=4)
+class SalesCounterTests(TestCase):
+    """Spread sales over shard rows and fold them back without losing counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bestseller = Product.objects.create(title="Bestseller", description="Sold", price="10.00")
+        cls.other = Product.objects.create(title="Other", description="Sold", price="10.00")
+
+    def totals(self):
+        return dict(with_total_sales(Product.objects.all()).values_list("title", "total_sales"))
+
+    def test_shards_add_up_and_fold(self):
+        for _ in range(20):
+            increment_sales({self.bestseller.id: 2, self.other.id: 1})
+        self.assertLessEqual(SalesCounterShard.objects.filter(product=self.bestseller).count(), 4)
+        self.assertEqual(self.totals(), {"Bestseller": 40, "Other": 20})
+
+        self.assertEqual(fold_sales_counters(batch_size=1), 2)
+        self.assertFalse(SalesCounterShard.objects.exists())
+        self.assertEqual(self.totals(), {"Bestseller": 40, "Other": 20})
+        self.bestseller.refresh_from_db()
+        self.assertEqual(self.bestseller.sales_counter, 40)
+
+    def test_detail_counts_sales_not_folded_yet(self):
+        Product.objects.filter(pk=self.bestseller.pk).update(sales_counter=5, is_sales=True)
+        increment_sales({self.bestseller.id: 3})
+        for url in (f"/api/v1/products/{self.bestseller.pk}/", f"/api/v1/async/products/{self.bestseller.pk}/"):
+            self.assertEqual(self.client.get(url).json()["sales_counter"], 8)
+        self.assertEqual(self.client.get("/api/v1/products/on-sales/").json()[0]["sales_counter"], 8)
+
+
+class OrderHistoryTests(TestCase):
+    """Page through a client's own orders newest first, with their items; history includes the archive."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Ordered product", description="Ordered", price="10.00")
+        make_user = get_user_model().objects.create_user
+        cls.user = make_user(email="orders@example.com", password="x", first_name="A", last_name="B", phone="+1")
+        cls.other = make_user(email="other@example.com", password="x", first_name="C", last_name="D", phone="+2")
+        cls.orders = [cls.place_order(cls.user, quantity) for quantity in range(1, 6)]
+        cls.place_order(cls.other, 1)
+
+    @classmethod
+    def place_order(cls, user, quantity):
+        address = Address.objects.create(postal_code="1", country="Ukraine", city="Kyiv", street_address="1")
+        order = Order.objects.create(
+            user=user, delivery_address=address, delivery_method="courier", payment_method="cash"
+        )
+        OrderItem.objects.create(order=order, product=cls.product, quantity=quantity, price="10.00")
+        return order
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def collect(self, url):
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data["results"])
+            url = data["next"]
+        return pages
+
+    def test_pages_follow_the_cursor_newest_first(self):
+        pages = self.collect("/api/v1/order/?page_size=2")
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        orders = [order for page in pages for order in page]
+        self.assertEqual([order["id"] for order in orders], [order.id for order in reversed(self.orders)])
+        self.assertEqual([order["items"][0]["quantity"] for order in orders], [5, 4, 3, 2, 1])
+        self.assertEqual(orders[0]["items"][0]["product"]["title"], "Ordered product")
+
+    def test_summary_counts_items(self):
+        results = self.client.get("/api/v1/order/?summary=1").json()["results"]
+        self.assertEqual([order["item_count"] for order in results], [5, 4, 3, 2, 1])
+        self.assertNotIn("items", results[0])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get("/api/v1/order/?cursor=garbage").status_code, 404)
+
+    def test_history_reads_through_the_archive(self):
+        old = [order.id for order in self.orders[:2]]
+        Order.objects.filter(id__in=old).update(created_at=timezone.now() - timedelta(days=400))
+        call_command("archive_orders", "--days", "365", stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertFalse(Order.objects.filter(id__in=old).exists())
+        self.assertEqual(len(self.client.get("/api/v1/order/").json()["results"]), 3)
+
+        orders = [order for page in self.collect("/api/v1/order/history/?page_size=2") for order in page]
+        self.assertEqual([order["id"] for order in orders], [order.id for order in reversed(self.orders)])
+        self.assertEqual([order.get("archived", False) for order in orders], [False] * 3 + [True] * 2)
+        self.assertEqual([order["items"][0]["quantity"] for order in orders], [5, 4, 3, 2, 1])
+
+
+@override_settings(CATALOG_CACHE_TTL=timedelta(0))
+class ProductCommentTests(TestCase):
+    """Page a product's comments separately from its detail, which keeps only a summary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Reviewed product", description="Reviewed", price="10.00")
+        user = get_user_model().objects.create_user(
+            email="reviewer@example.com", password="x", first_name="Re", last_name="Viewer", phone="+380000000006"
+        )
+        cls.ratings = [3, 5, 1, 5, 4]
+        for rating in cls.ratings:
+            Comment.objects.create(user=user, product=cls.product, text=f"{rating} stars", rating=rating)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def ratings_in(self, url):
+        ratings = []
+        while url:
+            data = self.client.get(url).json()
+            ratings += [comment["rating"] for comment in data["results"]]
+            url = data["next"]
+        return ratings
+
+    def test_pages_newest_first_or_by_rating(self):
+        path = f"/api/v1/products/{self.product.id}/comments/?page_size=2"
+        self.assertEqual(self.ratings_in(path), self.ratings[::-1])
+        self.assertEqual(self.ratings_in(path + "&sort=rating"), [5, 5, 4, 3, 1])
+
+    def test_detail_has_only_a_summary(self):
+        data = self.client.get(f"/api/v1/products/{self.product.id}/").json()
+        self.assertNotIn("comments", data)
+        summary = data["comments_summary"]
+        self.assertEqual(summary["count"], 5)
+        self.assertNotIn("average_rating", summary)
+        self.assertEqual([comment["rating"] for comment in summary["latest"]], [4, 5, 1])
+
+
+class RatingSummaryTests(TestCase):
+    """Keep each product's rating histogram, review count and average in step with its comments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Rated product", description="Rated", price="10.00")
+        cls.user = get_user_model().objects.create_user(
+            email="rater@example.com", password="x", first_name="Ra", last_name="Ter", phone="+380000000007"
+        )
+
+    def summary(self):
+        self.product.refresh_from_db()
+        return self.product.reviews, self.product.average_rating(), self.product.rating_histogram()
+
+    def test_comment_changes_update_the_summary(self):
+        comments = [
+            Comment.objects.create(user=self.user, product=self.product, text="Rated", rating=rating)
+            for rating in (5, 4, 4)
+        ]
+        self.assertEqual(self.summary(), (3, 4.3, {"5": 1, "4": 2, "3": 0, "2": 0, "1": 0}))
+
+        comments[0].rating = 1
+        comments[0].save()
+        self.assertEqual(self.summary(), (3, 3.0, {"5": 0, "4": 2, "3": 0, "2": 0, "1": 1}))
+
+        for comment in comments:
+            comment.delete()
+        self.assertEqual(self.summary(), (0, None, {"5": 0, "4": 0, "3": 0, "2": 0, "1": 0}))
+
+    def test_unrated_products_sort_last(self):
+        Product.objects.create(title="Unrated product", description="Rated", price="10.00")
+        Product.objects.create(title="Low rated product", description="Rated", price="10.00", rating=2)
+        Product.objects.filter(pk=self.product.pk).update(rating=4)
+        client = APIClient()
+        for ordering, titles in (
+            ("-rating", ["Rated product", "Low rated product", "Unrated product"]),
+            ("rating", ["Low rated product", "Rated product", "Unrated product"]),
+        ):
+            results = client.get(f"/api/v1/products/?ordering={ordering}").json()["results"]
+            self.assertEqual([product["title"] for product in results], titles)
+
+    def test_rebuild_repairs_drift(self):
+        Comment.objects.create(user=self.user, product=self.product, text="Rated", rating=2)
+        Product.objects.update(reviews=7, rating=5, rating_2_count=0, rating_5_count=7)
+
+        call_command("rebuild_rating_summaries", stdout=StringIO())
+        self.assertEqual(self.summary(), (1, 2.0, {"5": 0, "4": 0, "3": 0, "2": 1, "1": 0}))
+
+
+class SeedingTests(TestCase):
+    """Seed the same rows from the same seed, and benchmark the endpoints on them."""
+
+    SIZES = ("--products", "8", "--users", "4", "--orders", "6", "--carts", "2", "--seed", "7")
+
+    def seed(self, *args):
+        call_command("seed_catalog", *self.SIZES, *args, stdout=StringIO())
+
+    def rows(self):
+        return {
+            "products": list(Product.objects.order_by("code").values_list(
+                "code", "title", "description", "price", "is_sales", "available", "reviews", "rating", "sales_counter"
+            )),
+            "brands": list(Product.objects.order_by("code", "brand__name").values_list("code", "brand__name")),
+            "comments": sorted(Comment.objects.values_list("product__code", "user__email", "text", "rating")),
+            "orders": list(Order.objects.order_by("id").values_list(
+                "status", "total_price", "delivery_method", "payment_method", "user__email", "delivery_address__city"
+            )),
+            "cart items": sorted(CartItem.objects.values_list("cart__user__email", "product__code", "quantity")),
+        }
+
+    def test_same_seed_same_rows(self):
+        self.seed()
+        first = self.rows()
+        self.assertEqual(len(first["products"]), 8)
+        self.assertEqual(len(first["orders"]), 6)
+
+        self.seed("--clear")
+        self.assertEqual(self.rows(), first)
+
+    def test_benchmark_runs_every_scenario(self):
+        self.seed()
+        out, err = StringIO(), StringIO()
+        call_command("bench_endpoints", "--iterations", "3", "--warmup", "1", stdout=out, stderr=err)
+        self.assertEqual(err.getvalue(), "")
+        rows = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual([row[0] for row in rows], list(SCENARIOS))
+        self.assertEqual([row[-1] for row in rows], ["0"] * len(SCENARIOS))
+        # The benchmark's checkouts are rolled back.
+        self.assertEqual(Order.objects.count(), 6)
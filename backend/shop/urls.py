@@ -10,7 +10,8 @@ from .views import (
     ProductImageViewSet,
     ColorViewSet,
     SizeViewSet,
-    CommentViewSet
+    CommentViewSet,
+    SalesRollupViewSet
 )
 
 router = routers.DefaultRouter()
@@ -23,6 +24,7 @@ router.register("product-images", ProductImageViewSet)
 router.register("color", ColorViewSet)
 router.register("size", SizeViewSet)
 router.register("comments", CommentViewSet)
+router.register("analytics/sales", SalesRollupViewSet, basename="sales-rollup")
 
 
 urlpatterns = [path("", include(router.urls))]
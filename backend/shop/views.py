@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from drf_yasg.utils import swagger_auto_schema
 
 from rest_framework import viewsets, mixins, permissions
@@ -6,9 +8,22 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAdminUser
 
+from django.db import transaction
+from django.db.models import Prefetch, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce
+
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .filters import ProductFilter
+from user.authentication import ClaimsAuthenticationMixin
+
+from .catalog_cache import CachedListMixin, cached_response
+from .counters import increment_sales, with_total_sales
+from .filters import ProductFilter, SalesRollupFilter
+from .idempotency import idempotent
+from .inventory import OutOfStock, commit_reservations, reserve_stock
+from .outbox import publish
+from .pagination import CommentPagination, KeysetPagination
+from .rollups import rollup_labels
 from .permissions import IsAdminOrSafeMethods
 
 from .models import (
@@ -22,7 +37,10 @@ from .models import (
     ProductImage,
     Color,
     Size,
-    Comment
+    Comment,
+    DailySalesRollup,
+    ArchivedOrder,
+    ArchivedOrderItem
 )
 
 from .serializers import (
@@ -33,31 +51,34 @@ from .serializers import (
     CartSerializer,
     AddToCartSerializer,
     OrderSerializer,
+    OrderSummarySerializer,
+    ArchivedOrderSerializer,
     OrderContactSerializer,
     OrderDeliverySerializer,
     OrderPaymentSerializer,
     ProductUploadImageSerializer,
     ColorSerializer,
     SizeSerializer,
-    CommentSerializer
+    CommentSerializer,
+    DailySalesRollupSerializer
 )
 
 
-class ColorViewSet(viewsets.ModelViewSet):
+class ColorViewSet(ClaimsAuthenticationMixin, CachedListMixin, viewsets.ModelViewSet):
     """Manage product colors."""
     queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = (IsAdminOrSafeMethods,)
 
 
-class SizeViewSet(viewsets.ModelViewSet):
+class SizeViewSet(ClaimsAuthenticationMixin, CachedListMixin, viewsets.ModelViewSet):
     """Manage product sizes."""
     queryset = Size.objects.all()
     serializer_class = SizeSerializer
     permission_classes = (IsAdminOrSafeMethods,)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ClaimsAuthenticationMixin, CachedListMixin, viewsets.ModelViewSet):
     """Manage product categories."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -66,9 +87,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 class CommentViewSet(viewsets.ModelViewSet):
     """Manage product comments."""
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related("user")
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CommentPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ("product",)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -77,6 +101,8 @@ class CommentViewSet(viewsets.ModelViewSet):
 
 
 class ProductViewSet(
+    ClaimsAuthenticationMixin,
+    CachedListMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
@@ -90,10 +116,21 @@ class ProductViewSet(
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ProductFilter
 
+    def get_queryset(self):
+        if self.action in ("list", "search", "top_sales"):
+            # ProductListSerializer only needs the images.
+            return Product.objects.prefetch_related("images")
+        if self.action == "comments":
+            # Only looked up to 404 on a missing product.
+            return Product.objects.all()
+        return with_total_sales(
+            self.queryset.prefetch_related("images", ProductSerializer.latest_comments_prefetch)
+        )
+
     def get_serializer_class(self):
         if self.action == "retrieve":
             return ProductSerializer
-        if self.action == "list":
+        if self.action in ("list", "search"):
             return ProductListSerializer
         return self.serializer_class
 
@@ -102,8 +139,9 @@ class ProductViewSet(
         operation_description="Get the top-selling products."
     )
     @action(detail=False, methods=["get"], url_path="top-sales")
+    @cached_response
     def top_sales(self, request):
-        top_products = self.queryset.order_by("-sales_counter")
+        top_products = with_total_sales(self.get_queryset()).order_by("-total_sales", "id")
         serializer = ProductListSerializer(top_products, many=True)
         return Response(serializer.data)
 
@@ -121,13 +159,26 @@ class ProductViewSet(
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
 
+    @swagger_auto_schema(
+        method="get",
+        operation_description="List a product's comments, newest first or by rating with ?sort=rating."
+    )
+    @action(detail=True, methods=["get"], url_path="comments")
+    def comments(self, request, pk=None):
+        product = self.get_object()
+        comments = Comment.objects.filter(product=product).select_related("user")
+        paginator = CommentPagination()
+        page = paginator.paginate_queryset(comments, request, self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @swagger_auto_schema(
         method="get",
         operation_description="Search for products based on filters."
     )
     @action(detail=False, methods=["get"], url_path="search")
     def search(self, request):
-        queryset = self.filter_queryset(self.queryset)
+        queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -148,12 +199,14 @@ class ProductViewSet(
     ]
             )
     def sales(self, request):
-        products_on_sale = self.queryset.filter(is_sales=True)
+        products_on_sale = self.get_queryset().filter(is_sales=True)
         serializer = self.get_serializer(products_on_sale, many=True)
         return Response(serializer.data)
 
 
 class CollectionViewSet(
+    ClaimsAuthenticationMixin,
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -168,17 +221,19 @@ class CollectionViewSet(
 class CartViewSet(viewsets.ModelViewSet):
     queryset = Cart.objects.all()
     permission_classes = ()
+    throttle_scope = "cart"
     serializer_class = CartSerializer
+    items_prefetch = Prefetch("items", queryset=CartItem.objects.with_totals())
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Cart.objects.filter(user=self.request.user)
+            return Cart.objects.filter(user=self.request.user).prefetch_related(self.items_prefetch)
         else:
             session_key = self.request.session.session_key
             if not session_key:
                 self.request.session.create()
                 session_key = self.request.session.session_key
-            return Cart.objects.filter(session_key=session_key)
+            return Cart.objects.filter(session_key=session_key).prefetch_related(self.items_prefetch)
 
     def list(self, request):
         if request.user.is_authenticated:
@@ -190,6 +245,7 @@ class CartViewSet(viewsets.ModelViewSet):
                 session_key = request.session.session_key
             cart, created = Cart.objects.get_or_create(session_key=session_key)
 
+        prefetch_related_objects([cart], self.items_prefetch)
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
 
@@ -212,6 +268,7 @@ class CartViewSet(viewsets.ModelViewSet):
         operation_description="Add a product to the cart."
     )
     @action(detail=False, methods=["post"], url_path="add")
+    @idempotent("cart.add")
     def add_to_cart(self, request):
         serializer = AddToCartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -228,10 +285,17 @@ class CartViewSet(viewsets.ModelViewSet):
                 session_key = request.session.session_key
             cart, _ = Cart.objects.get_or_create(session_key=session_key)
 
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
+        cart_item, created = CartItem.objects.get_or_create(
+            cart=cart,
+            product=product,
+            size=serializer.validated_data.get("size"),
+            color=serializer.validated_data.get("color"),
+            defaults={"quantity": quantity},
+        )
         if not created:
             cart_item.quantity += quantity
         cart_item.save()
+        cart.save(update_fields=["updated_at"])
 
         return Response({"detail": "Product added to cart"}, status=201)
 
@@ -239,67 +303,120 @@ class CartViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    throttle_scope = "order"
+    pagination_class = KeysetPagination
+    items_prefetch = Prefetch(
+        "items",
+        queryset=OrderItem.objects.select_related("product", "size", "color").prefetch_related(
+            Prefetch("product__images", queryset=ProductImage.objects.filter(is_main=True))
+        ),
+    )
 
-    def get_queryset(self):
+    def is_summary(self):
+        return self.action == "list" and self.request.query_params.get("summary") in ("1", "true")
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return OrderSummarySerializer
+        return self.serializer_class
+
+    def get_owner_filter(self):
         if self.request.user.is_authenticated:
-            return Order.objects.filter(user=self.request.user).select_related("delivery_address")
-        else:
+            return {"user": self.request.user}
+        session_key = self.request.session.session_key
+        if not session_key:
+            self.request.session.create()
             session_key = self.request.session.session_key
-            if not session_key:
-                self.request.session.create()
-                session_key = self.request.session.session_key
-            return Order.objects.filter(session_key=session_key).select_related("delivery_address")
+        return {"session_key": session_key}
+
+    def get_queryset(self):
+        orders = Order.objects.filter(**self.get_owner_filter())
+        if self.is_summary():
+            return orders.annotate(item_count=Coalesce(Sum("items__quantity"), 0))
+        orders = orders.select_related("delivery_address")
+        if self.action in ("list", "retrieve"):
+            orders = orders.prefetch_related(self.items_prefetch)
+        return orders
+
+    @idempotent("order.create")
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
-            cart = Cart.objects.filter(user=self.request.user).first()
+            carts = Cart.objects.filter(user=self.request.user)
         else:
             session_key = self.request.session.session_key
             if not session_key:
                 self.request.session.create()
                 session_key = self.request.session.session_key
-            cart = Cart.objects.filter(session_key=session_key).first()
-
-        if not cart or not cart.items.exists():
-            raise ValidationError("Cart is empty. Cannot create an order.")
-
-        total_price = sum(item.product.price * item.quantity for item in cart.items.all())
-        total_price += serializer.validated_data.get("delivery_cost", 0)
-
-        order = serializer.save(
-            user=self.request.user if self.request.user.is_authenticated else None,
-            session_key=session_key if not self.request.user.is_authenticated else None,
-            total_price=total_price,
-            first_name=serializer.validated_data.get("first_name"),
-            last_name=serializer.validated_data.get("last_name"),
-            email=serializer.validated_data.get("email"),
-            phone=serializer.validated_data.get("phone"),
-        )
+            carts = Cart.objects.filter(session_key=session_key)
+
+        with transaction.atomic():
+            # Lock the cart so concurrent retries cannot check out the same lines twice.
+            cart = carts.select_for_update().first()
+            items = list(cart.items.select_related("product")) if cart else []
+            if not items:
+                raise ValidationError("Cart is empty. Cannot create an order.")
+
+            total_price = sum(item.product.price * item.quantity for item in items)
+            total_price += serializer.validated_data.get("delivery_cost", 0)
+
+            order = serializer.save(
+                user=self.request.user if self.request.user.is_authenticated else None,
+                session_key=session_key if not self.request.user.is_authenticated else None,
+                total_price=total_price,
+                first_name=serializer.validated_data.get("first_name"),
+                last_name=serializer.validated_data.get("last_name"),
+                email=serializer.validated_data.get("email"),
+                phone=serializer.validated_data.get("phone"),
+            )
 
-        for item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price,
+            try:
+                reserve_stock(order, items)
+            except OutOfStock as error:
+                raise ValidationError(str(error))
+
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    size_id=item.size_id,
+                    color_id=item.color_id,
+                    quantity=item.quantity,
+                    price=item.product.price,
+                )
+                for item in items
             )
 
-            item.product.sales_counter += item.quantity
-            item.product.save(update_fields=["sales_counter"])
+            sold = defaultdict(int)
+            for item in items:
+                sold[item.product_id] += item.quantity
+            increment_sales(sold)
+
+            CartItem.objects.filter(cart=cart).delete()
 
-        cart.items.all().delete()
+            publish("order.created", {"order_id": order.id, "total_price": str(total_price)})
+
+        prefetch_related_objects([order], self.items_prefetch)
 
     @swagger_auto_schema(
         method="post",
         request_body=OrderPaymentSerializer,
-        operation_description="Set payment details for an order."
+        operation_description=(
+            "Set payment details for an order. This confirms the order: the stock reserved at checkout is "
+            "kept instead of being released after STOCK_RESERVATION_TTL."
+        )
     )
     @action(detail=True, methods=["post"], url_path="set-payment")
     def set_payment(self, request, pk=None):
         order = self.get_object()
         serializer = OrderPaymentSerializer(order, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            if order.status == "cancelled" or not commit_reservations(order):
+                raise ValidationError("The order's stock reservation expired. Place the order again.")
+            serializer.save()
         return Response({"detail": "Payment method updated successfully"})
 
     @swagger_auto_schema(
@@ -333,14 +450,78 @@ class OrderViewSet(viewsets.ModelViewSet):
         operation_description="Create a new order."
     )
     @action(detail=False, methods=["post"], url_path="create")
+    @idempotent("order.create")
     def create_order(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        method="get",
+        operation_description="List the full order history, including archived orders, newest first."
+    )
+    @action(detail=False, methods=["get"])
+    def history(self, request):
+        owner = self.get_owner_filter()
+        orders = Order.objects.filter(**owner).select_related("delivery_address").prefetch_related(
+            self.items_prefetch
+        )
+        archived = ArchivedOrder.objects.filter(**owner).prefetch_related(
+            Prefetch("items", queryset=ArchivedOrderItem.objects.select_related("product", "size", "color")),
+            Prefetch("items__product__images", queryset=ProductImage.objects.filter(is_main=True)),
+        )
+        paginator = self.paginator
+        page = paginator.paginate_querysets([orders, archived], request, self)
+        data = [
+            (ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer)(
+                order, context=self.get_serializer_context()
+            ).data
+            for order in page
+        ]
+        return paginator.get_paginated_response(data)
+
 
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductUploadImageSerializer
     permission_classes = (IsAdminUser,)
+
+
+class SalesRollupViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Serve precomputed daily sales rollups to admins."""
+    queryset = DailySalesRollup.objects.order_by("-date", "-revenue")
+    serializer_class = DailySalesRollupSerializer
+    permission_classes = (IsAdminUser,)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = SalesRollupFilter
+
+    def serialize(self, rows):
+        labels = rollup_labels(self.request.query_params.get("dimension"), {row.key for row in rows})
+        return self.get_serializer(rows, many=True, context={**self.get_serializer_context(), "labels": labels})
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize(page).data)
+        return Response(self.serialize(list(queryset)).data)
+
+    @swagger_auto_schema(
+        method="get",
+        operation_description="Sum the rollups of one dimension over the requested date range."
+    )
+    @action(detail=False, methods=["get"])
+    def totals(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = [
+            DailySalesRollup(dimension=row["dimension"], key=row["key"], orders=row["orders"],
+                             units=row["units"], revenue=row["revenue"])
+            for row in queryset.order_by().values("dimension", "key").annotate(
+                orders=Sum("orders"), units=Sum("units"), revenue=Sum("revenue")
+            ).order_by("-revenue")
+        ]
+        data = self.serialize(rows).data
+        for row in data:
+            del row["date"]
+        return Response(data)
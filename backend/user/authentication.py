@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Copied into every token so claims-only authentication can build a user without the database.
+TOKEN_USER_CLAIMS = ("email", "first_name", "last_name", "is_staff", "is_superuser")
+CACHED_USER_FIELDS = ("id", "email", "first_name", "last_name", "is_active", "is_staff", "is_superuser")
+
+
+class UserCache:
+    """A thread-safe LRU of user field values whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, values = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return values
+
+    def set(self, key, values):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_TTL.total_seconds())
+
+
+def user_cache_metrics():
+    yield "counter", "jwt_user_cache_requests_total", (("result", "hit"),), user_cache.hits
+    yield "counter", "jwt_user_cache_requests_total", (("result", "miss"),), user_cache.misses
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves users from a short-lived per-process cache.
+
+    Only the fields in CACHED_USER_FIELDS are loaded; anything else is fetched on
+    first access. Saving or deleting a user drops its entry in this process, other
+    processes pick the change up within JWT_USER_CACHE_TTL.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        fields = CACHED_USER_FIELDS + (("password",) if api_settings.CHECK_REVOKE_TOKEN else ())
+        values = user_cache.get(user_id)
+        if values is None:
+            values = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*fields).first()
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, values)
+        # from_db expects the loaded values in the model's field order.
+        field_names = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in values]
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model), field_names, [values[name] for name in field_names]
+        )
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """A user built from token claims alone; is_staff and names are as of the token's issue."""
+
+    @property
+    def email(self):
+        return self.token.get("email", "")
+
+    @property
+    def first_name(self):
+        return self.token.get("first_name", "")
+
+    @property
+    def last_name(self):
+        return self.token.get("last_name", "")
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """Authenticate from the token's claims without touching the database."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return ClaimsUser(validated_token)
+
+
+class ClaimsAuthenticationMixin:
+    """
+    Use claims-only authentication for safe methods on read-only endpoints.
+
+    request.user is then a ClaimsUser, not a model instance, so only mix this into
+    views that never query by or save the user on safe methods.
+    """
+
+    def get_authenticators(self):
+        if self.request.method in SAFE_METHODS:
+            return [ClaimsJWTAuthentication()]
+        return super().get_authenticators()
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token carrying TOKEN_USER_CLAIMS; access tokens derived from it copy them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in TOKEN_USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
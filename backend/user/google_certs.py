@@ -0,0 +1,177 @@
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from google.auth import exceptions
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class HTTPCertSource:
+    """Fetch Google's signing certificates over a pooled, retrying HTTP session."""
+    url = GOOGLE_CERTS_URL
+    timeout = 5
+    default_max_age = 300
+
+    def __init__(self):
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=4, max_retries=retries))
+
+    def fetch(self):
+        """Return ({key id: PEM certificate}, seconds the response may be cached)."""
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            certs = response.json()
+        except (requests.RequestException, ValueError) as error:
+            raise exceptions.TransportError(f"Could not fetch Google certificates: {error}") from error
+        return certs, self.max_age(response.headers)
+
+    def max_age(self, headers):
+        match = MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+        if not match:
+            return self.default_max_age
+        try:
+            age = int(headers.get("Age", 0))
+        except ValueError:
+            age = 0
+        return max(int(match.group(1)) - age, 0)
+
+
+class StaticCertSource:
+    """Serve a fixed key set from settings.GOOGLE_STATIC_CERTS, for tests and offline development."""
+
+    def fetch(self):
+        return dict(settings.GOOGLE_STATIC_CERTS), 24 * 60 * 60
+
+
+class CertCache:
+    """
+    Keep the certificates in memory for as long as the source allows.
+
+    Shortly before they expire a background thread refetches them, so logins keep
+    using the current set instead of waiting on Google. If a fetch fails while an
+    older set is held, that set is kept and served for retry_interval seconds before
+    the next fetch, so an outage does not make every login wait on a timeout.
+    """
+
+    def __init__(self, source, refresh_ahead=60, min_refresh_interval=30, retry_interval=30):
+        self.source = source
+        self.refresh_ahead = refresh_ahead
+        self.min_refresh_interval = min_refresh_interval
+        self.retry_interval = retry_interval
+        self.certs = None
+        self.expires_at = 0
+        self.fetched_at = 0
+        self.retry_at = 0
+        self.lock = threading.Lock()
+        self.refreshing = False
+        # "hit", "miss" (the caller waited for a fetch) and "error" counts, for metrics.
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+
+    def count(self, result):
+        with self.counts_lock:
+            self.counts[result] += 1
+
+    def get(self, force_refresh=False):
+        now = time.monotonic()
+        if self.certs is not None and not force_refresh:
+            if now >= self.expires_at:
+                self.count("miss")
+                return self.refresh()
+            if now >= self.expires_at - self.refresh_ahead and now >= self.retry_at:
+                self.refresh_in_background()
+            self.count("hit")
+            return self.certs
+        if force_refresh and now - self.fetched_at < self.min_refresh_interval:
+            self.count("hit")
+            return self.certs
+        self.count("miss")
+        return self.refresh()
+
+    def refresh(self):
+        with self.lock:
+            # Another thread may have refreshed, or failed to, while this one waited for the lock.
+            now = time.monotonic()
+            if self.certs is not None and (now - self.fetched_at < self.min_refresh_interval or now < self.retry_at):
+                return self.certs
+            try:
+                certs, max_age = self.source.fetch()
+            except exceptions.TransportError:
+                self.count("error")
+                if self.certs is None:
+                    raise
+                logger.warning("Refreshing Google certificates failed, keeping the cached set", exc_info=True)
+                self.retry_at = time.monotonic() + self.retry_interval
+                self.expires_at = max(self.expires_at, self.retry_at)
+                return self.certs
+            self.certs = certs
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + max_age
+            return certs
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self.refreshing = False
+
+        threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+
+@functools.lru_cache(maxsize=None)
+def get_cert_cache():
+    source = import_string(settings.GOOGLE_CERTS_SOURCE)()
+    return CertCache(source, refresh_ahead=settings.GOOGLE_CERTS_REFRESH_AHEAD.total_seconds())
+
+
+def cert_cache_metrics():
+    # Only report once a Google login has created the cache.
+    if not get_cert_cache.cache_info().currsize:
+        return
+    cache = get_cert_cache()
+    with cache.counts_lock:
+        counts = dict(cache.counts)
+    for result, count in counts.items():
+        yield "counter", "google_certs_cache_requests_total", (("result", result),), count
+
+
+def verify_google_id_token(token, audience):
+    """
+    Verify a Google ID token against the cached certificates and return its claims.
+
+    Raises ValueError for invalid tokens and google.auth.exceptions.TransportError when
+    no certificates could be fetched.
+    """
+    # google.auth.jwt pulls in the RSA and ASN.1 libraries; only logins need them.
+    from google.auth import jwt
+
+    cache = get_cert_cache()
+    certs = cache.get()
+    # Google rotates keys; an unknown key id means our set is older than the token.
+    if jwt.decode_header(token).get("kid") not in certs:
+        certs = cache.get(force_refresh=True)
+    claims = jwt.decode(token, certs=certs, audience=audience)
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError("Invalid token issuer.")
+    return claims
@@ -4,6 +4,9 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .authentication import UserRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -49,3 +52,8 @@ class UserSerializer(serializers.ModelSerializer):
             user.set_password(password)
             user.save()
         return user
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issue token pairs that carry the user claims used by claims-only authentication"""
+    token_class = UserRefreshToken
@@ -1,3 +1,184 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+import rsa
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from google.auth import crypt, exceptions, jwt
+from rest_framework.test import APIClient
+
+from lingerie_shop.testing import QueryBudgetMixin
+from user.authentication import UserCache, UserRefreshToken, user_cache
+from user.google_certs import CertCache, get_cert_cache
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Keep authentication and profile endpoints within their query budgets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="budget@example.com",
+            password="budget-password",
+            first_name="Budget",
+            last_name="Test",
+            phone="+380000000001",
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        user_cache.clear()
+
+    def login(self):
+        response = self.client.post(
+            "/api/v1/auth/login/", {"email": self.user.email, "password": "budget-password"}, format="json"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_register(self):
+        data = {
+            "email": "new@example.com",
+            "password": "new-password-123",
+            "confirm_password": "new-password-123",
+            "first_name": "New",
+            "last_name": "User",
+            "phone": "+380000000002",
+        }
+        self.assertQueryBudget(3, "post", "/api/v1/auth/register/", data=data, format="json")
+
+    def test_login(self):
+        data = {"email": self.user.email, "password": "budget-password"}
+        self.assertQueryBudget(1, "post", "/api/v1/auth/login/", data=data, format="json")
+
+    def test_profile(self):
+        self.login()
+        self.assertQueryBudget(1, "get", "/api/v1/auth/profile/")
+
+    def test_cached_user_lookup(self):
+        # The second request takes the user from the cache instead of the database.
+        self.login()
+        _, first = self.request_queries("get", "/api/v1/order/")
+        _, second = self.request_queries("get", "/api/v1/order/")
+        self.assertEqual(len(second), len(first) - 1)
+
+    def test_claims_only_catalog(self):
+        self.login()
+        _, queries = self.request_queries("get", "/api/v1/collections/")
+        self.assertFalse([sql for sql in queries if "user_user" in sql])
+
+
+class UserCacheTests(SimpleTestCase):
+    """Evict the least recently used entries and expire old ones."""
+
+    def test_lru_eviction(self):
+        cache = UserCache(maxsize=2, ttl=60)
+        cache.set(1, "one")
+        cache.set(2, "two")
+        cache.get(1)
+        cache.set(3, "three")
+        self.assertEqual((cache.get(1), cache.get(2), cache.get(3)), ("one", None, "three"))
+
+    def test_expiry(self):
+        cache = UserCache(maxsize=2, ttl=0)
+        cache.set(1, "one")
+        self.assertIsNone(cache.get(1))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+
+class CachedUserInvalidationTests(TestCase):
+    """Drop a cached user as soon as it is saved or deleted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="cached@example.com", password="x", first_name="Cached", last_name="User", phone="+380000000008"
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_changes_apply_to_the_next_request(self):
+        self.assertEqual(self.client.get("/api/v1/auth/profile/").data["first_name"], "Cached")
+        self.user.first_name = "Renamed"
+        self.user.save()
+        self.assertEqual(self.client.get("/api/v1/auth/profile/").data["first_name"], "Renamed")
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/v1/auth/profile/").status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get("/api/v1/auth/profile/")
+        self.user.delete()
+        self.assertEqual(self.client.get("/api/v1/auth/profile/").status_code, 401)
+
+
+class FlakySource:
+    """A certificate source whose fetches fail once `failing` is set."""
+
+    def __init__(self):
+        self.fetches = 0
+        self.failing = False
+
+    def fetch(self):
+        self.fetches += 1
+        if self.failing:
+            raise exceptions.TransportError("Google is down")
+        return {"key": "certificate"}, 0
+
+
+class CertCacheTests(SimpleTestCase):
+    """Serve cached certificates and back off after failed refreshes."""
+
+    def test_failed_refresh_keeps_the_set_and_backs_off(self):
+        source = FlakySource()
+        cache = CertCache(source, refresh_ahead=0, min_refresh_interval=0, retry_interval=60)
+        certs = cache.get()
+        source.failing = True
+
+        # Expired: one caller tries to refetch and gets the old set back.
+        with self.assertLogs("user.google_certs", "WARNING"):
+            self.assertEqual(cache.get(), certs)
+        self.assertEqual(source.fetches, 2)
+        # Until the retry interval passes nobody waits on Google again.
+        self.assertEqual(cache.get(), certs)
+        self.assertEqual(cache.get(force_refresh=True), certs)
+        self.assertEqual(source.fetches, 2)
+        self.assertEqual(cache.counts["error"], 1)
+
+
+@override_settings(GOOGLE_CERTS_SOURCE="user.google_certs.StaticCertSource")
+class GoogleLoginTests(TestCase):
+    """Verify Google ID tokens against a static key set."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        public_key, private_key = rsa.newkeys(512)
+        cls.signer = crypt.RSASigner.from_string(private_key.save_pkcs1(), key_id="test-key")
+        cls.enterClassContext(override_settings(GOOGLE_STATIC_CERTS={"test-key": public_key.save_pkcs1()}))
+
+    def setUp(self):
+        get_cert_cache.cache_clear()
+        self.addCleanup(get_cert_cache.cache_clear)
+
+    def login(self, **claims):
+        now = int(time.time())
+        token = jwt.encode(self.signer, {
+            "iss": "https://accounts.google.com", "aud": "client-id", "iat": now, "exp": now + 300,
+            "email": "google@example.com", "given_name": "Google", "family_name": "User", **claims,
+        })
+        return APIClient().post(
+            "/api/v1/auth/google/", {"credential": token.decode(), "clientId": "client-id"}, format="json"
+        )
+
+    def test_valid_token_logs_in(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(get_user_model().objects.filter(email="google@example.com").exists())
+
+    def test_foreign_issuer_is_rejected(self):
+        self.assertEqual(self.login(iss="https://example.com").status_code, 400)
+        self.assertEqual(self.login(aud="other-client").status_code, 400)
@@ -4,16 +4,17 @@ from drf_yasg import openapi
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_503_SERVICE_UNAVAILABLE
 
 from django.db import transaction
 
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google.auth.exceptions import TransportError
 
+from user.authentication import UserRefreshToken
+from user.google_certs import verify_google_id_token
 from user.models import User
 
 from .serializers import UserSerializer
@@ -21,6 +22,7 @@ from .serializers import UserSerializer
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    throttle_scope = "auth"
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
@@ -32,11 +34,20 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
+class LoginView(TokenObtainPairView):
+    throttle_scope = "auth"
+
+
+class RefreshView(TokenRefreshView):
+    throttle_scope = "auth"
+
+
 class GoogleView(APIView):
     """
     Endpoint for Google ID token verification
     """
     permission_classes = (AllowAny,)
+    throttle_scope = "auth"
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -70,19 +81,16 @@ class GoogleView(APIView):
             return Response({"message": "Token and clientId are required."}, status=HTTP_400_BAD_REQUEST)
 
         try:
-            # Google ID token verification
-            idinfo = id_token.verify_oauth2_token(
-                token,
-                requests.Request(),
-                client_id
-            )
-
-            # Checking if the token was issued by Google
-            if idinfo["iss"] not in ["accounts.google.com", "https://accounts.google.com"]:
-                return Response({"message": "Invalid token issuer."}, status=HTTP_400_BAD_REQUEST)
-
+            # Google ID token verification against the cached signing certificates,
+            # including the issuer check
+            idinfo = verify_google_id_token(token, client_id)
         except ValueError as e:
             return Response({"message": f"Invalid or expired token: {str(e)}"}, status=HTTP_400_BAD_REQUEST)
+        except TransportError:
+            return Response(
+                {"message": "Could not reach Google to verify the token."},
+                status=HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
         # Getting data from the token
         email = idinfo.get("email")
@@ -112,7 +120,7 @@ class GoogleView(APIView):
             user.save()
 
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         response = {
             "username": user.username,
             "first_name": user.first_name,
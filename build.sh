@@ -6,6 +6,9 @@ set -o errexit
 pip install -r requirements.txt
 
 
+# Generate the OpenAPI schema once instead of on every request
+python backend/manage.py generate_schema
+
 # Convert static asset files
 python backend/manage.py collectstatic --no-input
 python backend/manage.py migrate
\ No newline at end of file